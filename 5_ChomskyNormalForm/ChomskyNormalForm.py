@@ -1,6 +1,8 @@
 import itertools
 from collections import defaultdict
 
+from cyk import CYKParser
+
 class CFG:
     def __init__(self, variables, terminals, start_symbol, productions):
         self.V = set(variables)
@@ -11,85 +13,155 @@ class CFG:
             for rhs in rhs_list:
                 self.P[lhs].append(tuple(rhs) if isinstance(rhs, str) else tuple(rhs))
 
+    @classmethod
+    def from_store(cls, store):
+        """Builds a CFG from a GrammarStore (lab1/store.py); ε becomes the empty production."""
+        productions = {store.symbols[lhs]: [tuple(store.symbols[symbol] for symbol in rhs) for rhs in rhs_list]
+                       for lhs, rhs_list in store.productions.items()}
+        return cls(store.nonterminals(), store.terminals(), store.symbols[store.start], productions)
+
+    def binarize(self):
+        """Splits right-hand sides longer than two symbols into chains of new variables.
+
+        A -> X1 X2 ... Xk becomes A -> X1 Y1, Y1 -> X2 Y2, ..., Y(k-2) -> X(k-1) Xk,
+        and equal suffixes share one chain. The Y names stay clear of the X
+        and T variables to_cnf() introduces and skip any existing variable.
+        """
+        new_P = defaultdict(list)
+        chains = {}
+        counter = 0
+        for A in self.P:
+            for prod in self.P[A]:
+                lhs, rhs = A, prod
+                while len(rhs) > 2:
+                    tail = rhs[1:]
+                    var = chains.get(tail)
+                    if var is not None:
+                        new_P[lhs].append((rhs[0], var))
+                        break
+                    counter += 1
+                    while f"Y{counter}" in self.V:
+                        counter += 1
+                    var = chains[tail] = f"Y{counter}"
+                    self.V.add(var)
+                    new_P[lhs].append((rhs[0], var))
+                    lhs, rhs = var, tail
+                else:
+                    new_P[lhs].append(rhs)
+        self.P = new_P
+
     def eliminate_epsilon(self):
+        # Nullable variables, by worklist: every production counts the symbols
+        # not yet known to be nullable, and `users` indexes productions by
+        # those symbols, so each nullable variable is propagated once.
         nullable = set()
-        changed = True
-        while changed:
-            changed = False
-            for A in self.V:
-                if A not in nullable:
-                    for prod in self.P[A]:
-                        if all(sym in nullable or sym == '' for sym in prod):
-                            nullable.add(A)
-                            changed = True
+        queue = []
+        waiting = []
+        users = defaultdict(list)
+        for A in self.V:
+            for prod in self.P.get(A, ()):
+                pending = [sym for sym in prod if sym != '']
+                if not pending:
+                    if A not in nullable:
+                        nullable.add(A)
+                        queue.append(A)
+                    continue
+                for sym in pending:
+                    users[sym].append(len(waiting))
+                waiting.append([A, len(pending)])
+        while queue:
+            B = queue.pop()
+            for index in users[B]:
+                entry = waiting[index]
+                entry[1] -= 1
+                if entry[1] == 0 and entry[0] not in nullable:
+                    nullable.add(entry[0])
+                    queue.append(entry[0])
 
         new_P = defaultdict(list)
         for A in self.P:
+            seen = set()
             for prod in self.P[A]:
-                subsets = list(itertools.product(*[[s, ''] if s in nullable else [s] for s in prod]))
+                subsets = itertools.product(*[[s, ''] if s in nullable else [s] for s in prod])
                 for alt in subsets:
                     new_rhs = tuple(s for s in alt if s != '')
-                    if new_rhs != () or A == self.S:
-                        if new_rhs not in new_P[A]:
-                            new_P[A].append(new_rhs)
+                    if (new_rhs != () or A == self.S) and new_rhs not in seen:
+                        seen.add(new_rhs)
+                        new_P[A].append(new_rhs)
         self.P = new_P
 
     def eliminate_renaming(self):
-        unit_pairs = set()
+        # units[A] lists the variables B with a unit production A -> B.
+        units = defaultdict(list)
         for A in self.V:
-            unit_pairs.add((A, A))
-
-        changed = True
-        while changed:
-            changed = False
-            for A in self.V:
-                for prod in self.P[A]:
-                    if len(prod) == 1 and prod[0] in self.V:
-                        B = prod[0]
-                        for C in self.V:
-                            if (B, C) in unit_pairs and (A, C) not in unit_pairs:
-                                unit_pairs.add((A, C))
-                                changed = True
+            for prod in self.P.get(A, ()):
+                if len(prod) == 1 and prod[0] in self.V:
+                    units[A].append(prod[0])
 
         new_P = defaultdict(list)
         for A in self.V:
-            for (X, Y) in unit_pairs:
-                if X == A:
-                    for prod in self.P[Y]:
-                        if len(prod) != 1 or prod[0] not in self.V:
-                            if prod not in new_P[A]:
-                                new_P[A].append(prod)
+            # Walk the variables A reaches through unit productions (A included),
+            # collecting their other productions once each. As after
+            # eliminate_epsilon(), only the start symbol keeps an ε-production.
+            reached = {A}
+            stack = [A]
+            seen = set() if A == self.S else {()}
+            while stack:
+                Y = stack.pop()
+                for prod in self.P.get(Y, ()):
+                    if (len(prod) != 1 or prod[0] not in self.V) and prod not in seen:
+                        seen.add(prod)
+                        new_P[A].append(prod)
+                for B in units[Y]:
+                    if B not in reached:
+                        reached.add(B)
+                        stack.append(B)
         self.P = new_P
 
     def eliminate_inaccessible(self):
         reachable = {self.S}
-        changed = True
-        while changed:
-            changed = False
-            for A in list(reachable):
-                for prod in self.P[A]:
-                    for sym in prod:
-                        if sym in self.V and sym not in reachable:
-                            reachable.add(sym)
-                            changed = True
+        stack = [self.S]
+        while stack:
+            A = stack.pop()
+            for prod in self.P.get(A, ()):
+                for sym in prod:
+                    if sym in self.V and sym not in reachable:
+                        reachable.add(sym)
+                        stack.append(sym)
         self.V = reachable
         self.P = {A: self.P[A] for A in self.V}
 
     def eliminate_non_productive(self):
+        # Same worklist scheme as for nullable variables, with terminals
+        # counting as already productive.
         productive = set()
-        changed = True
-        while changed:
-            changed = False
-            for A in self.V:
-                for prod in self.P[A]:
-                    if all(sym in self.T or sym in productive for sym in prod):
-                        if A not in productive:
-                            productive.add(A)
-                            changed = True
+        queue = []
+        waiting = []
+        users = defaultdict(list)
+        for A in self.V:
+            for prod in self.P.get(A, ()):
+                pending = [sym for sym in prod if sym not in self.T]
+                if not pending:
+                    if A not in productive:
+                        productive.add(A)
+                        queue.append(A)
+                    continue
+                for sym in pending:
+                    users[sym].append(len(waiting))
+                waiting.append([A, len(pending)])
+        while queue:
+            B = queue.pop()
+            for index in users[B]:
+                entry = waiting[index]
+                entry[1] -= 1
+                if entry[1] == 0 and entry[0] not in productive:
+                    productive.add(entry[0])
+                    queue.append(entry[0])
+
         self.V = self.V & productive
         new_P = defaultdict(list)
         for A in self.V:
-            for prod in self.P[A]:
+            for prod in self.P.get(A, ()):
                 if all(sym in self.T or sym in self.V for sym in prod):
                     new_P[A].append(prod)
         self.P = new_P
@@ -134,7 +206,15 @@ class CFG:
 
         self.P = new_P
 
-    def normalize(self):
+    def normalize(self, bin_first=False):
+        """Brings the grammar into CNF.
+
+        With bin_first, long right-hand sides are binarised before ε is
+        eliminated (BIN before DEL): a production with k nullable symbols
+        then yields O(k) productions instead of up to 2^k.
+        """
+        if bin_first:
+            self.binarize()
         self.eliminate_epsilon()
         self.eliminate_renaming()
         self.eliminate_inaccessible()
@@ -150,21 +230,27 @@ class CFG:
             for prod in self.P[A]:
                 print(f"  {A} -> {''.join(prod)}")
 
-variables = {'S', 'A', 'B', 'C', 'D'}
-terminals = {'a', 'b'}
-start_symbol = 'S'
-productions = {
-    'S': ['abAB'],
-    'A': ['aSab', 'BS', 'aA', 'b'],
-    'B': ['BA', 'ababB', 'b', ''],
-    'C': ['AS']
-}
+if __name__ == "__main__":
+    variables = {'S', 'A', 'B', 'C', 'D'}
+    terminals = {'a', 'b'}
+    start_symbol = 'S'
+    productions = {
+        'S': ['abAB'],
+        'A': ['aSab', 'BS', 'aA', 'b'],
+        'B': ['BA', 'ababB', 'b', ''],
+        'C': ['AS']
+    }
+
+    cfg = CFG(variables, terminals, start_symbol, productions)
+    print("Before normalization:")
+    cfg.print_grammar()
 
-cfg = CFG(variables, terminals, start_symbol, productions)
-print("Before normalization:")
-cfg.print_grammar()
+    cfg.normalize()
 
-cfg.normalize()
+    print("\nAfter normalization to CNF:")
+    cfg.print_grammar()
 
-print("\nAfter normalization to CNF:")
-cfg.print_grammar()
+    parser = CYKParser(cfg)
+    for string in ("abb", "abbb", "abba"):
+        tree = parser.parse(string)
+        print(f"\nCYK parse of {string!r}:", tree.to_list() if tree else "not in the language")
@@ -0,0 +1,267 @@
+import itertools
+import random
+import sys
+import time
+from collections import defaultdict
+
+from ChomskyNormalForm import CFG
+from cyk import CYKParser
+
+
+class LegacyCFG(CFG):
+    """The original fixpoint passes, kept for comparison."""
+
+    def eliminate_epsilon(self):
+        nullable = set()
+        changed = True
+        while changed:
+            changed = False
+            for A in self.V:
+                if A not in nullable:
+                    for prod in self.P[A]:
+                        if all(sym in nullable or sym == '' for sym in prod):
+                            nullable.add(A)
+                            changed = True
+
+        new_P = defaultdict(list)
+        for A in self.P:
+            for prod in self.P[A]:
+                subsets = list(itertools.product(*[[s, ''] if s in nullable else [s] for s in prod]))
+                for alt in subsets:
+                    new_rhs = tuple(s for s in alt if s != '')
+                    if new_rhs != () or A == self.S:
+                        if new_rhs not in new_P[A]:
+                            new_P[A].append(new_rhs)
+        self.P = new_P
+
+    def eliminate_renaming(self):
+        unit_pairs = set()
+        for A in self.V:
+            unit_pairs.add((A, A))
+
+        changed = True
+        while changed:
+            changed = False
+            for A in self.V:
+                for prod in self.P[A]:
+                    if len(prod) == 1 and prod[0] in self.V:
+                        B = prod[0]
+                        for C in self.V:
+                            if (B, C) in unit_pairs and (A, C) not in unit_pairs:
+                                unit_pairs.add((A, C))
+                                changed = True
+
+        new_P = defaultdict(list)
+        for A in self.V:
+            for (X, Y) in unit_pairs:
+                if X == A:
+                    for prod in self.P[Y]:
+                        if len(prod) != 1 or prod[0] not in self.V:
+                            if prod not in new_P[A]:
+                                new_P[A].append(prod)
+        self.P = new_P
+
+    def eliminate_inaccessible(self):
+        reachable = {self.S}
+        changed = True
+        while changed:
+            changed = False
+            for A in list(reachable):
+                for prod in self.P[A]:
+                    for sym in prod:
+                        if sym in self.V and sym not in reachable:
+                            reachable.add(sym)
+                            changed = True
+        self.V = reachable
+        self.P = {A: self.P[A] for A in self.V}
+
+    def eliminate_non_productive(self):
+        productive = set()
+        changed = True
+        while changed:
+            changed = False
+            for A in self.V:
+                for prod in self.P[A]:
+                    if all(sym in self.T or sym in productive for sym in prod):
+                        if A not in productive:
+                            productive.add(A)
+                            changed = True
+        self.V = self.V & productive
+        new_P = defaultdict(list)
+        for A in self.V:
+            for prod in self.P[A]:
+                if all(sym in self.T or sym in self.V for sym in prod):
+                    new_P[A].append(prod)
+        self.P = new_P
+
+
+def measure(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def random_grammar(size, seed=0):
+    """A CFG with `size` productions over size / 4 variables.
+
+    About 2% of the productions are ε and 10% are unit productions; the rest
+    have one to four symbols, half of them variables. Variables refer to
+    the next few variables (wrapping around), like the layered rules of a
+    real grammar, which keeps unit closures small.
+    """
+    rng = random.Random(seed)
+    variables = [f"N{i}" for i in range(max(2, size // 4))]
+    terminals = ["a", "b", "c"]
+    productions = defaultdict(list)
+    for index in range(size):
+        position = index % len(variables)
+        nearby = lambda: variables[(position + rng.randint(1, 8)) % len(variables)]
+        roll = rng.random()
+        if roll < 0.02:
+            rhs = ()
+        elif roll < 0.12:
+            rhs = (nearby(),)
+        else:
+            rhs = tuple(nearby() if rng.random() < 0.5 else rng.choice(terminals)
+                        for _ in range(rng.randint(1, 4)))
+        productions[variables[position]].append(rhs)
+    return variables, terminals, variables[0], productions
+
+
+def passes(cfg):
+    cfg.eliminate_epsilon()
+    cfg.eliminate_renaming()
+    cfg.eliminate_inaccessible()
+    cfg.eliminate_non_productive()
+    return cfg
+
+
+def bench_normalize(sizes=(10 ** 3, 10 ** 4, 10 ** 5), legacy_limit=10 ** 4):
+    for size in sizes:
+        grammar = random_grammar(size)
+        print(f"normalising a grammar with {size:,} productions")
+        cfg, elapsed = measure(lambda: passes(CFG(*grammar)))
+        print(f"  worklist passes:          {elapsed:8.3f} s, {sum(map(len, cfg.P.values())):,} productions left")
+        _, elapsed = measure(cfg.to_cnf)
+        print(f"  to_cnf:                   {elapsed:8.3f} s, {sum(map(len, cfg.P.values())):,} productions in CNF")
+        if size <= legacy_limit:
+            legacy, elapsed = measure(lambda: passes(LegacyCFG(*grammar)))
+            print(f"  fixpoint passes (before): {elapsed:8.3f} s")
+            # The old eliminate_renaming also copied S -> ε into variables with a unit production to S.
+            expected = {A: set(prods) - ({()} if A != legacy.S else set()) for A, prods in legacy.P.items()}
+            expected = {A: prods for A, prods in expected.items() if prods}
+            assert {A: set(prods) for A, prods in passes(CFG(*grammar)).P.items() if prods} == expected
+
+
+def nullable_grammar(length, rules=4):
+    """S has `rules` right-hand sides of `length` variables N0..N(length-1), each of which is ε or a terminal."""
+    variables = [f"N{i}" for i in range(length)] + ["S"]
+    productions = {f"N{i}": [(), ("a" if i % 2 else "b",)] for i in range(length)}
+    productions["S"] = [tuple(variables[(offset + i) % length] for i in range(length)) for offset in range(rules)]
+    return variables, ["a", "b"], "S", productions
+
+
+def count(cfg):
+    return sum(map(len, cfg.P.values()))
+
+
+def normalized(grammar, bin_first):
+    cfg = CFG(*grammar)
+    cfg.normalize(bin_first)
+    return cfg
+
+
+def bench_epsilon(lengths=(8, 12, 16, 64, 256), default_limit=16):
+    for length in lengths:
+        grammar = nullable_grammar(length)
+        print(f"right-hand sides of {length} nullable variables")
+        for label, bin_first in (("DEL then BIN:", False), ("BIN then DEL:", True)):
+            if not bin_first and length > default_limit:
+                continue
+            cfg = CFG(*grammar)
+            if bin_first:
+                cfg.binarize()
+            _, elapsed = measure(cfg.eliminate_epsilon)
+            after_epsilon = count(cfg)
+            cfg, total = measure(lambda: normalized(grammar, bin_first))
+            print(f"  {label} {after_epsilon:10,} productions after ε-elimination ({elapsed:7.3f} s), "
+                  f"{count(cfg):10,} in CNF ({total:7.3f} s)")
+
+
+def expression_grammar():
+    """E -> E+T | T, T -> T*F | F, F -> (E) | a, normalised to CNF."""
+    cfg = CFG({'E', 'T', 'F'}, {'+', '*', '(', ')', 'a'}, 'E',
+              {'E': ['E+T', 'T'], 'T': ['T*F', 'F'], 'F': ['(E)', 'a']})
+    cfg.normalize()
+    return cfg
+
+
+def expression(length, seed=0):
+    """A random arithmetic expression of about `length` characters, nested about length / 4 deep."""
+    rng = random.Random(seed)
+    expr = "a"
+    while len(expr) < length:
+        roll = rng.random()
+        if roll < 0.4:
+            expr = "(" + expr + ")" + rng.choice("+*") + "a"
+        elif roll < 0.8:
+            expr = "a" + rng.choice("+*") + "(" + expr + ")"
+        else:
+            expr = expr + rng.choice("+*") + "a"
+    return expr
+
+
+def textbook_cyk(cfg, string):
+    """CYK with a set per cell, trying every split against every binary production."""
+    n = len(string)
+    binary = [(A, prod) for A, prods in cfg.P.items() for prod in prods if len(prod) == 2]
+    table = [[set() for _ in range(n + 1)] for _ in range(n + 1)]
+    for i, symbol in enumerate(string):
+        table[i][i + 1] = {A for A, prods in cfg.P.items() if (symbol,) in prods}
+    for span in range(2, n + 1):
+        for i in range(n - span + 1):
+            k = i + span
+            for m in range(i + 1, k):
+                for A, (B, C) in binary:
+                    if B in table[i][m] and C in table[m][k]:
+                        table[i][k].add(A)
+    return cfg.S in table[0][n]
+
+
+def bench_cyk(lengths=(1000, 2000, 5000), textbook_lengths=(100, 200), flat_lengths=(201, 401)):
+    cfg = expression_grammar()
+    parser = CYKParser(cfg)
+    print(f"CYK over arithmetic expressions, CNF grammar with {sum(map(len, cfg.P.values()))} productions")
+    for length in textbook_lengths:
+        string = expression(length)
+        accepted, elapsed = measure(lambda: textbook_cyk(cfg, string))
+        print(f"  length {len(string):,}: textbook CYK {elapsed * 1000:10.1f} ms")
+        assert accepted and parser.accepts(string)
+    for length in lengths:
+        string = expression(length)
+        chart, elapsed = measure(lambda: parser.chart(string))
+        cells = sum(map(len, chart.cells))
+        print(f"  length {len(string):,}: bitset chart {elapsed * 1000:10.1f} ms, {cells:,} non-empty cells")
+        tree, elapsed = measure(lambda: parser.parse(string).to_list())
+        print(f"  {'':>{len(f'{len(string):,}') + 8}} parse + tree   {elapsed * 1000:10.1f} ms")
+        broken = string[:len(string) // 2] + string[len(string) // 2 + 1:]
+        rejected, elapsed = measure(lambda: parser.accepts(broken))
+        print(f"  {'':>{len(f'{len(string):,}') + 8}} rejecting     {elapsed * 1000:10.1f} ms")
+        assert tree[0] == cfg.S and not rejected
+    # a+a+...+a: every operand-aligned substring is an E, so the chart is dense and CYK is cubic again.
+    for length in flat_lengths:
+        string = "+".join("a" * ((length + 1) // 2))
+        chart, elapsed = measure(lambda: parser.chart(string))
+        print(f"  flat sum of length {len(string):,}: bitset chart {elapsed * 1000:10.1f} ms, "
+              f"{sum(map(len, chart.cells)):,} non-empty cells")
+
+
+BENCHMARKS = {
+    'normalize': bench_normalize,
+    'epsilon': bench_epsilon,
+    'cyk': bench_cyk,
+}
+
+if __name__ == "__main__":
+    for name in sys.argv[1:] or BENCHMARKS:
+        BENCHMARKS[name]()
@@ -0,0 +1,200 @@
+# Most (left, right) cell pairs recur within one grammar; the memo of
+# combine() is emptied when it reaches this many entries.
+MEMO_SIZE = 1 << 16
+
+class Chart:
+    """The CYK chart of one string.
+
+    `cells[i]` maps an end position k to the bitmask of nonterminals that
+    derive string[i:k]; empty cells are not stored. `ends[i]` and
+    `starts[k]` are bitsets over positions: bit k of ends[i] (bit i of
+    starts[k]) is set when cell (i, k) is non-empty.
+    """
+
+    def __init__(self, string):
+        self.string = string
+        n = len(string)
+        self.cells = [{} for _ in range(n + 1)]
+        self.ends = [0] * (n + 1)
+        self.starts = [0] * (n + 1)
+
+    def cell(self, i, k):
+        return self.cells[i].get(k, 0)
+
+    def add(self, i, k, mask):
+        self.cells[i][k] = mask
+        self.ends[i] |= 1 << k
+        self.starts[k] |= 1 << i
+
+class ParseNode:
+    """A node of a parse tree; its children are only worked out when first asked for."""
+
+    __slots__ = ('parser', 'chart', 'symbol', 'start', 'end', '_children')
+
+    def __init__(self, parser, chart, symbol, start, end):
+        self.parser = parser
+        self.chart = chart
+        self.symbol = symbol
+        self.start = start
+        self.end = end
+        self._children = None
+
+    @property
+    def label(self):
+        return self.parser.variables[self.symbol]
+
+    @property
+    def children(self):
+        """The terminal (as a string) for A -> a, no children for S -> ε, else the two child nodes."""
+        if self._children is None:
+            if self.end == self.start:
+                self._children = ()
+            elif self.end - self.start == 1:
+                self._children = self.chart.string[self.start]
+            else:
+                B, m, C = self.parser.split(self.chart, self.symbol, self.start, self.end)
+                self._children = (ParseNode(self.parser, self.chart, B, self.start, m),
+                                  ParseNode(self.parser, self.chart, C, m, self.end))
+        return self._children
+
+    def to_list(self):
+        """The whole tree as nested [label, terminal] / [label, left, right] lists ([S] for ε).
+
+        Built with an explicit stack, so trees as deep as the input is long are fine.
+        """
+        root = [self.label]
+        stack = [(self, root)]
+        while stack:
+            node, out = stack.pop()
+            children = node.children
+            if isinstance(children, str):
+                out.append(children)
+                continue
+            if not children:
+                continue
+            for child in children:
+                out.append([child.label])
+            stack.append((children[1], out[2]))
+            stack.append((children[0], out[1]))
+        return root
+
+class CYKParser:
+    """CYK recognition and parsing for a CFG in Chomsky normal form (see CFG.normalize()).
+
+    Nonterminals are bits of an int; a chart cell is the bitmask of the
+    nonterminals deriving that substring. Binary productions are indexed by
+    their left child B, so combining two cells walks the set bits of the
+    left one and ORs in the heads of the rules whose right child is in the
+    right cell; results are memoised per pair of cells, up to MEMO_SIZE
+    pairs. Cells are filled end position by end position, and only at
+    starts that can still produce a non-empty cell, using the non-empty-cell
+    bitsets of the chart to find splits without scanning every position.
+    """
+
+    def __init__(self, cfg):
+        self.variables = sorted(cfg.V | set(cfg.P) | {cfg.S})
+        self.ids = {variable: index for index, variable in enumerate(self.variables)}
+        self.start = self.ids[cfg.S]
+        # terminals[t]: mask of A with A -> t.
+        self.terminals = {}
+        # pairs[B]: [(mask of C, mask of heads A with A -> B C)]; right_masks[B]: OR of those C masks.
+        pairs = {}
+        # rules[A]: (B, C) for every A -> B C, for tree extraction.
+        self.rules = [[] for _ in self.variables]
+        self.nullable = False
+        for A, prods in cfg.P.items():
+            head = self.ids[A]
+            for prod in prods:
+                if len(prod) == 1 and prod[0] not in self.ids:
+                    self.terminals[prod[0]] = self.terminals.get(prod[0], 0) | 1 << head
+                elif len(prod) == 2 and prod[0] in self.ids and prod[1] in self.ids:
+                    B, C = self.ids[prod[0]], self.ids[prod[1]]
+                    pairs.setdefault(B, {})
+                    pairs[B][C] = pairs[B].get(C, 0) | 1 << head
+                    self.rules[head].append((B, C))
+                elif not prod and head == self.start:
+                    self.nullable = True
+                else:
+                    raise ValueError(f"{A} -> {''.join(prod)} is not in Chomsky normal form")
+        self.pairs = [[(1 << C, heads) for C, heads in pairs.get(B, {}).items()] for B in range(len(self.variables))]
+        self.right_masks = [sum(mask for mask, _ in row) for row in self.pairs]
+        self.memo = {}
+
+    def combine(self, left, right):
+        """The heads A of rules A -> B C with B in `left` and C in `right`."""
+        key = (left, right)
+        heads = self.memo.get(key)
+        if heads is None:
+            heads = 0
+            pairs, right_masks = self.pairs, self.right_masks
+            while left:
+                low = left & -left
+                B = low.bit_length() - 1
+                left ^= low
+                if right & right_masks[B]:
+                    for mask, rule_heads in pairs[B]:
+                        if right & mask:
+                            heads |= rule_heads
+            if len(self.memo) >= MEMO_SIZE:
+                self.memo.clear()
+            self.memo[key] = heads
+        return heads
+
+    def chart(self, string):
+        chart = Chart(string)
+        cells, ends, starts = chart.cells, chart.ends, chart.starts
+        combine = self.combine
+        for k in range(1, len(string) + 1):
+            mask = self.terminals.get(string[k - 1], 0)
+            if not mask:
+                continue
+            chart.add(k - 1, k, mask)
+            # Starts i < k - 1 worth trying: those of cells ending where a
+            # non-empty cell (m, k) begins. Highest first, so every (m, k)
+            # with m > i is complete when (i, k) is computed.
+            candidates = starts[k - 1]
+            while candidates:
+                i = candidates.bit_length() - 1
+                candidates ^= 1 << i
+                heads = 0
+                splits = ends[i] & starts[k]
+                while splits:
+                    low = splits & -splits
+                    m = low.bit_length() - 1
+                    splits ^= low
+                    heads |= combine(cells[i][m], cells[m][k])
+                if heads:
+                    chart.add(i, k, heads)
+                    candidates |= starts[i]
+        return chart
+
+    def accepts(self, string):
+        if not string:
+            return self.nullable
+        return bool(self.chart(string).cell(0, len(string)) >> self.start & 1)
+
+    def parse(self, string):
+        """The root ParseNode of a parse of `string`, or None if it is not in the language.
+
+        The tree is extracted lazily from the chart: the split under a node
+        is only looked up when its children are first asked for.
+        """
+        if not string:
+            return ParseNode(self, Chart(string), self.start, 0, 0) if self.nullable else None
+        chart = self.chart(string)
+        if not chart.cell(0, len(string)) >> self.start & 1:
+            return None
+        return ParseNode(self, chart, self.start, 0, len(string))
+
+    def split(self, chart, A, i, k):
+        """A rule A -> B C and a position m with B over [i, m) and C over [m, k), as (B, m, C)."""
+        splits = chart.ends[i] & chart.starts[k]
+        while splits:
+            low = splits & -splits
+            m = low.bit_length() - 1
+            splits ^= low
+            left, right = chart.cells[i][m], chart.cells[m][k]
+            for B, C in self.rules[A]:
+                if left >> B & 1 and right >> C & 1:
+                    return B, m, C
+        raise ValueError(f"{self.variables[A]} does not derive {chart.string[i:k]!r}")
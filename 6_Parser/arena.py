@@ -0,0 +1,228 @@
+import marshal
+import struct
+from array import array
+
+from lexer import TokenType
+from parser import Number, Variable, BinaryOp, Assignment, FunctionCall, Block, ForLoop, IterativeParser
+
+KINDS = [Number, Variable, BinaryOp, Assignment, FunctionCall, Block, ForLoop]
+KIND_CODES = {cls: code for code, cls in enumerate(KINDS)}
+
+# Attribute names of each node class, in constructor order.
+FIELDS = {
+    Number: ('value',),
+    Variable: ('name',),
+    BinaryOp: ('left', 'op', 'right'),
+    Assignment: ('target', 'value'),
+    FunctionCall: ('name', 'argument'),
+    Block: ('statements',),
+    ForLoop: ('init', 'condition', 'update', 'body'),
+}
+
+TYPES_BY_CODE = [None] + list(TokenType)
+
+# dumps() layout: node count, children count and values size, then the raw
+# kinds/tokens/a/b/c/children arrays, then the marshalled values list.
+HEADER = struct.Struct('<III')
+
+class ASTArena:
+    """Flat AST storage: every node is a slot in parallel typed arrays.
+
+    Nodes are referred to by integer id. Children are always added before
+    their parent, so a child's id is smaller than its parent's. `tokens[id]`
+    is the index of the node's first token. Per kind, the a/b/c slots hold:
+
+        Number        index into values
+        Variable      index into values
+        BinaryOp      left id, operator TokenType value, right id
+        Assignment    target id, value id
+        FunctionCall  index into values (the name), argument id
+        Block         offset into children, statement count
+        ForLoop       offset into children (init, condition, update, body)
+    """
+
+    def __init__(self):
+        self.kinds = array('B')
+        self.tokens = array('i')
+        self.a = array('i')
+        self.b = array('i')
+        self.c = array('i')
+        self.children = array('i')
+        # Numbers and names, interned so repeated identifiers are stored once.
+        self.values = []
+        self.value_ids = {}
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def intern(self, value):
+        key = (type(value), value)
+        index = self.value_ids.get(key)
+        if index is None:
+            index = self.value_ids[key] = len(self.values)
+            self.values.append(value)
+        return index
+
+    def add(self, cls, start, *fields):
+        """Stores a node built from the same fields as `cls(*fields)` and returns its id."""
+        a = b = c = 0
+        if cls is Number or cls is Variable:
+            a = self.intern(fields[0])
+        elif cls is BinaryOp:
+            a, op, c = fields
+            b = op.value
+        elif cls is Assignment:
+            a, b = fields
+        elif cls is FunctionCall:
+            a = self.intern(fields[0])
+            b = fields[1]
+        elif cls is Block:
+            a = len(self.children)
+            b = len(fields[0])
+            self.children.extend(fields[0])
+        else:
+            a = len(self.children)
+            b = 4
+            self.children.extend(fields)
+        self.kinds.append(KIND_CODES[cls])
+        self.tokens.append(start)
+        self.a.append(a)
+        self.b.append(b)
+        self.c.append(c)
+        return len(self.kinds) - 1
+
+    def arrays(self):
+        return (self.kinds, self.tokens, self.a, self.b, self.c, self.children)
+
+    def dumps(self):
+        """Serialises the arena into a compact bytes object; see loads()."""
+        values = marshal.dumps(self.values)
+        header = HEADER.pack(len(self.kinds), len(self.children), len(values))
+        return b''.join([header, *(column.tobytes() for column in self.arrays()), values])
+
+    @classmethod
+    def loads(cls, data):
+        """Rebuilds an arena from dumps() output written on the same platform."""
+        arena = cls()
+        data = memoryview(data)
+        count, children, values_size = HEADER.unpack_from(data)
+        offset = HEADER.size
+        for column in arena.arrays():
+            size = (children if column is arena.children else count) * column.itemsize
+            column.frombytes(data[offset:offset + size])
+            offset += size
+        arena.values = marshal.loads(data[offset:offset + values_size])
+        arena.value_ids = {(type(value), value): index for index, value in enumerate(arena.values)}
+        return arena
+
+    def kind(self, node_id):
+        return KINDS[self.kinds[node_id]]
+
+    def child_ids(self, node_id):
+        """Ids of the direct children of a node, in field order."""
+        cls = KINDS[self.kinds[node_id]]
+        if cls is BinaryOp:
+            return (self.a[node_id], self.c[node_id])
+        if cls is Assignment:
+            return (self.a[node_id], self.b[node_id])
+        if cls is FunctionCall:
+            return (self.b[node_id],)
+        if cls is Block or cls is ForLoop:
+            start = self.a[node_id]
+            return self.children[start:start + self.b[node_id]]
+        return ()
+
+    def fields(self, node_id):
+        """Field values of a node, in constructor order, with child nodes as views.
+
+        A NodeView calls this once and keeps the result.
+        """
+        cls = KINDS[self.kinds[node_id]]
+        a, b, c = self.a[node_id], self.b[node_id], self.c[node_id]
+        if cls is Number or cls is Variable:
+            return (self.values[a],)
+        if cls is BinaryOp:
+            return (self.view(a), TYPES_BY_CODE[b], self.view(c))
+        if cls is Assignment:
+            return (self.view(a), self.view(b))
+        if cls is FunctionCall:
+            return (self.values[a], self.view(b))
+        children = [self.view(child) for child in self.children[a:a + b]]
+        if cls is Block:
+            return (children,)
+        return tuple(children)
+
+    def view(self, node_id):
+        return NodeView(self, node_id)
+
+    def walk(self, root):
+        """Yields the ids of `root` and all its descendants in pre-order."""
+        pending = [root]
+        while pending:
+            node_id = pending.pop()
+            yield node_id
+            pending.extend(reversed(self.child_ids(node_id)))
+
+    def to_ast(self, root):
+        """Rebuilds the ordinary ASTNode tree rooted at `root`."""
+        nodes = {}
+        for node_id in sorted(self.walk(root)):
+            cls = KINDS[self.kinds[node_id]]
+            a, b, c = self.a[node_id], self.b[node_id], self.c[node_id]
+            if cls is Number or cls is Variable:
+                node = cls(self.values[a])
+            elif cls is BinaryOp:
+                node = BinaryOp(nodes[a], TYPES_BY_CODE[b], nodes[c])
+            elif cls is Assignment:
+                node = Assignment(nodes[a], nodes[b])
+            elif cls is FunctionCall:
+                node = FunctionCall(self.values[a], nodes[b])
+            elif cls is Block:
+                node = Block([nodes[child] for child in self.children[a:a + b]])
+            else:
+                node = ForLoop(*[nodes[child] for child in self.children[a:a + b]])
+            nodes[node_id] = node
+        return nodes[root]
+
+class NodeView:
+    """Read-only stand-in for an ASTNode stored in an ASTArena.
+
+    Exposes the same attributes as the node class it stands for, plus `kind`
+    (that class), `id` and `start` (the index of its first token). The fields
+    are decoded from the arena on first access and kept.
+    """
+
+    __slots__ = ('arena', 'id', 'kind', 'decoded')
+
+    def __init__(self, arena, node_id):
+        self.arena = arena
+        self.id = node_id
+        self.kind = arena.kind(node_id)
+        self.decoded = None
+
+    @property
+    def start(self):
+        return self.arena.tokens[self.id]
+
+    def __getattr__(self, name):
+        names = FIELDS[self.kind]
+        if name not in names:
+            raise AttributeError(f"{self.kind.__name__} has no attribute {name!r}")
+        if self.decoded is None:
+            self.decoded = self.arena.fields(self.id)
+        return self.decoded[names.index(name)]
+
+    def __eq__(self, other):
+        return isinstance(other, NodeView) and other.arena is self.arena and other.id == self.id
+
+    def __hash__(self):
+        return hash(self.id)
+
+    def __repr__(self):
+        return self.kind.__repr__(self)
+
+def parse_arena(tokens, parser_class=IterativeParser):
+    """Parses into a fresh ASTArena and returns (arena, root id)."""
+    arena = ASTArena()
+    parser = parser_class(tokens, arena=arena)
+    return arena, parser.parse()
@@ -0,0 +1,110 @@
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from lexer import Lexer
+from arena import ASTArena, parse_arena
+
+class FileResult:
+    """Outcome of parsing one file: a serialised ASTArena, or the error it raised."""
+
+    __slots__ = ('path', 'size', 'root', 'data', 'error')
+
+    def __init__(self, path, size, root=None, data=None, error=None):
+        self.path = path
+        self.size = size
+        self.root = root
+        self.data = data
+        self.error = error
+
+    def arena(self):
+        return ASTArena.loads(self.data)
+
+    def ast(self):
+        return self.arena().to_ast(self.root)
+
+    def __repr__(self):
+        if self.error:
+            return f"FileResult({self.path!r}, error={self.error!r})"
+        return f"FileResult({self.path!r}, {self.size} bytes, {len(self.data)} bytes of AST)"
+
+def parse_file(path):
+    """Lexes and parses one file; runs inside the worker processes."""
+    size = 0
+    try:
+        with open(path, 'rb') as source:
+            raw = source.read()
+        size = len(raw)
+        tokens = Lexer(raw.decode('utf-8')).tokenize_buffer()
+        arena, root = parse_arena(tokens)
+        return FileResult(path, size, root, arena.dumps())
+    except Exception as error:
+        return FileResult(path, size, error=f"{type(error).__name__}: {error}")
+
+def collect_paths(inputs, suffix=''):
+    """Expands directories (recursively, files ending in `suffix`) into a sorted file list."""
+    paths = []
+    for name in inputs:
+        if os.path.isdir(name):
+            for directory, _, files in os.walk(name):
+                paths.extend(os.path.join(directory, file) for file in files if file.endswith(suffix))
+        else:
+            paths.append(name)
+    return sorted(paths)
+
+def parse_files(paths, workers=None, chunksize=None):
+    """Parses `paths` across a process pool; returns their FileResults in order.
+
+    Files are handed out `chunksize` at a time so each task round trip covers
+    several files; by default every worker gets about four chunks.
+    """
+    paths = list(paths)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if chunksize is None:
+        chunksize = max(1, len(paths) // (workers * 4))
+    with ProcessPoolExecutor(workers) as executor:
+        return list(executor.map(parse_file, paths, chunksize=chunksize))
+
+def positive_int(text):
+    try:
+        value = int(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"{text!r} is not an integer") from None
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"{value} is not a positive integer")
+    return value
+
+def worker_counts(text):
+    """Parses "4" or "1,2,4,8" into a list of positive worker counts."""
+    return [positive_int(count) for count in text.split(',')]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Lex and parse many program files in parallel.")
+    parser.add_argument('inputs', nargs='+', help="files, or directories to search")
+    parser.add_argument('--suffix', default='', help="only parse files in directories ending with this")
+    parser.add_argument('--workers', type=worker_counts, default=[os.cpu_count() or 1],
+                        help="worker count, or a comma-separated list to compare, e.g. 1,2,4,8")
+    parser.add_argument('--chunksize', type=positive_int, help="files per task (default: about 4 tasks per worker)")
+    args = parser.parse_args(argv)
+
+    paths = collect_paths(args.inputs, args.suffix)
+    if not paths:
+        parser.error("no input files")
+    for workers in args.workers:
+        start = time.perf_counter()
+        results = parse_files(paths, workers, args.chunksize)
+        elapsed = time.perf_counter() - start
+        megabytes = sum(result.size for result in results) / 1e6
+        errors = [result for result in results if result.error]
+        print(f"{workers:3d} workers: {len(results)} files, {megabytes:.1f} MB in {elapsed:.2f} s, "
+              f"{len(results) / elapsed:,.0f} files/sec, {megabytes / elapsed:.2f} MB/sec, "
+              f"{len(errors)} errors")
+    for result in errors:
+        print(f"{result.path}: {result.error}", file=sys.stderr)
+    return 1 if errors else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
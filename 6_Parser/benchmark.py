@@ -0,0 +1,272 @@
+import os
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+from array import array
+
+from lexer import TOKEN_REGEX, KEYWORDS, TokenType, Token, Lexer
+from parser import ASTNode, Parser, IterativeParser
+from arena import parse_arena
+from interpreter import interpret, compile_program
+from vectorize import compile_vectorized
+from incremental import Document
+from batch import parse_files
+
+STATEMENT = """
+    for (i = 0; i <= 10; i = i + 1) {
+        sin(i);
+        cos(i * 2.5);
+        x = x + (i - 3) / 4;
+    }
+"""
+
+
+def generate_source(size):
+    """Builds a program of roughly `size` characters."""
+    count = max(1, size // len(STATEMENT))
+    return "{" + STATEMENT * count + "}"
+
+
+def legacy_tokenize(text):
+    """The original per-position, per-pattern tokenizer, kept for comparison."""
+    tokens = []
+    pos = 0
+    while pos < len(text):
+        match = None
+        for regex, type_ in TOKEN_REGEX:
+            pattern = re.compile(regex)
+            match = pattern.match(text, pos)
+            if match:
+                value = match.group(0)
+                if type_:
+                    if type_ == 'IDENTIFIER_OR_KEYWORD':
+                        token_type = KEYWORDS.get(value, TokenType.IDENTIFIER)
+                        tokens.append(Token(token_type, value))
+                    else:
+                        val = float(value) if type_ == TokenType.NUMBER and '.' in value else value
+                        tokens.append(Token(type_, val))
+                break
+        if not match:
+            raise ValueError(f"Illegal character at position {pos}: {text[pos]}")
+        else:
+            pos = match.end()
+    return tokens
+
+
+class DictToken:
+    """A token with a per-instance __dict__, as Token was before __slots__."""
+
+    def __init__(self, type_, value=None, start=None, end=None):
+        self.type = type_
+        self.value = value
+        self.start = start
+        self.end = end
+
+
+def measure(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def bench_tokenize(size=4 * 1024 * 1024):
+    code = generate_source(size)
+    print(f"Tokenizing {len(code) / 1e6:.1f} MB")
+    tokens, elapsed = measure(Lexer(code).tokenize)
+    print(f"  master regex: {len(tokens) / elapsed:12,.0f} tokens/sec")
+    legacy, legacy_elapsed = measure(lambda: legacy_tokenize(code))
+    print(f"  legacy:       {len(legacy) / legacy_elapsed:12,.0f} tokens/sec")
+    assert [(t.type, t.value) for t in tokens] == [(t.type, t.value) for t in legacy]
+
+
+def traced_peak(fn):
+    tracemalloc.start()
+    result = fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, peak
+
+
+def bench_token_memory(size=4 * 1024 * 1024):
+    code = generate_source(size)
+    print(f"Token storage for {len(code) / 1e6:.1f} MB of source")
+    tokens, peak = traced_peak(Lexer(code).tokenize)
+    print(f"  Token (__slots__): {peak / 1e6:8.1f} MB for {len(tokens):,} tokens")
+    del tokens
+    tokens, peak = traced_peak(lambda: [DictToken(t.type, t.value, t.start, t.end) for t in Lexer(code).iter_tokens()])
+    print(f"  Token (__dict__):  {peak / 1e6:8.1f} MB")
+    del tokens
+    buffer, peak = traced_peak(Lexer(code).tokenize_buffer)
+    print(f"  TokenBuffer:       {peak / 1e6:8.1f} MB")
+    _, elapsed = measure(Parser(buffer).parse)
+    print(f"  parsed from TokenBuffer in {elapsed:.2f}s")
+
+
+def ast_equal(a, b):
+    """Structural comparison that does not recurse, for very deep trees."""
+    pending = [(a, b)]
+    while pending:
+        a, b = pending.pop()
+        if isinstance(a, list) and isinstance(b, list):
+            if len(a) != len(b):
+                return False
+            pending.extend(zip(a, b))
+        elif isinstance(a, ASTNode):
+            if type(a) is not type(b):
+                return False
+            pending.extend(zip(vars(a).values(), vars(b).values()))
+        elif a != b:
+            return False
+    return True
+
+
+def nested_loops(depth):
+    return "{" + "for (i = 0; i < 1; i = i + 1) { x = x + 1; " * depth + "}" * depth + "}"
+
+
+def nested_parens(depth):
+    return "{ x = " + "(" * depth + "1 + y" + ") * 2" * depth + "; }"
+
+
+def bench_nesting(depths=(200, 10000)):
+    for depth in depths:
+        for label, code in (("for blocks", nested_loops(depth)), ("parentheses", nested_parens(depth))):
+            tokens = Lexer(code).tokenize()
+            print(f"{label} nested {depth:,} deep")
+            tree, elapsed = measure(IterativeParser(tokens).parse)
+            print(f"  iterative: {elapsed * 1000:8.1f} ms")
+            try:
+                expected, elapsed = measure(Parser(tokens).parse)
+            except RecursionError:
+                print("  recursive: RecursionError at the default limit")
+                # Each nesting level costs the recursive parser about 3 frames.
+                limit = sys.getrecursionlimit()
+                sys.setrecursionlimit(depth * 4 + limit)
+                try:
+                    expected, elapsed = measure(Parser(tokens).parse)
+                finally:
+                    sys.setrecursionlimit(limit)
+            print(f"  recursive: {elapsed * 1000:8.1f} ms")
+            assert ast_equal(tree, expected)
+
+
+def count_nodes(tree):
+    count = 0
+    pending = [tree]
+    while pending:
+        node = pending.pop()
+        if isinstance(node, list):
+            pending.extend(node)
+        elif isinstance(node, ASTNode):
+            count += 1
+            pending.extend(vars(node).values())
+    return count
+
+
+def bench_arena(size=2 * 1024 * 1024):
+    code = generate_source(size)
+    tokens = Lexer(code).tokenize_buffer()
+    print(f"AST for {len(code) / 1e6:.1f} MB of source")
+    tree, peak = traced_peak(IterativeParser(tokens).parse)
+    print(f"  objects: {peak / 1e6:8.1f} MB peak while parsing")
+    nodes, elapsed = measure(lambda: count_nodes(tree))
+    print(f"           walked {nodes:,} nodes in {elapsed * 1000:.0f} ms")
+    del tree
+    (arena, root), peak = traced_peak(lambda: parse_arena(tokens))
+    print(f"  arena:   {peak / 1e6:8.1f} MB peak while parsing")
+    nodes, elapsed = measure(lambda: sum(1 for _ in arena.walk(root)))
+    print(f"           walked {nodes:,} nodes in {elapsed * 1000:.0f} ms")
+
+
+def numeric_loop(iterations):
+    return ("{ x = 0; for (i = 0; i < " + str(iterations) + "; i = i + 1) "
+            "{ x = x + i * 2 - (i / 3); sin(i); cos(x); } }")
+
+
+def bench_evaluate(iterations=200000):
+    ast = IterativeParser(Lexer(numeric_loop(iterations)).tokenize()).parse()
+    print(f"for loop with {iterations:,} iterations")
+    expected, elapsed = measure(lambda: interpret(ast))
+    print(f"  tree walking:      {elapsed * 1000:8.0f} ms")
+    run, compile_time = measure(lambda: compile_program(ast))
+    result, elapsed = measure(run)
+    print(f"  compiled closures: {elapsed * 1000:8.0f} ms (+{compile_time * 1000:.2f} ms to compile)")
+    assert result == expected
+
+
+def bench_vectorize(sizes=(10 ** 6, 10 ** 7)):
+    for iterations in sizes:
+        code = "{ for (i = 0; i < " + str(iterations) + "; i = i + 1) { sin(i * 0.001); cos(i); } }"
+        ast = IterativeParser(Lexer(code).tokenize()).parse()
+        print(f"trig loop with {iterations:,} iterations")
+        run = compile_program(ast)
+        (env, scalar), elapsed = measure(lambda: run(output=array('d')))
+        print(f"  scalar closures: {elapsed * 1000:8.0f} ms")
+        run = compile_vectorized(ast)
+        (vector_env, vector), elapsed = measure(lambda: run(output=array('d')))
+        print(f"  numpy:           {elapsed * 1000:8.0f} ms")
+        assert env == vector_env and len(scalar) == len(vector)
+        assert max(abs(a - b) for a, b in zip(scalar, vector)) < 1e-9
+    # Loops that must behave exactly as the scalar closures do.
+    for code in ("{ for (i = 5; i < 0; i = i + step) { sin(i + z); } }",
+                 "{ for (i = 9007199254740990; i < 9007199254741000; i = i + 1) { sin(i - 9007199254740990); } }",
+                 "{ for (i = 999990; i < 1000000; i = i + 1) { sin(i * i * i * i); } }",
+                 "{ for (i = 1; i < 10; i = i + 1) { sin(i * 9007199254740993); } }",
+                 # More than one block, with float rounding carried across blocks.
+                 "{ for (i = 1; i < 300000; i = i + 0.1) { cos(i - i); } }"):
+        ast = IterativeParser(Lexer(code).tokenize()).parse()
+        assert compile_vectorized(ast)() == compile_program(ast)()
+
+
+def bench_incremental(size=1024 * 1024):
+    code = generate_source(size)
+    document = Document(code)
+    middle = len(code) // 2
+    edits = (
+        ("replace a digit", lambda text: (text.index("10", middle), 1, "2")),
+        ("insert a character", lambda text: (text.index("x = x", middle), 0, "y")),
+        ("insert a statement", lambda text: (text.index("4;", middle) + 2, 0, " z = 1;")),
+    )
+    print(f"Single edits to {len(code) / 1e6:.1f} MB of source")
+    for label, edit in edits:
+        arguments = edit(document.text)
+        ast, elapsed = measure(lambda: document.edit(*arguments))
+        print(f"  {label + ':':22} incremental {elapsed * 1000:8.2f} ms", end="")
+        expected, elapsed = measure(lambda: Parser(Lexer(document.text).tokenize()).parse())
+        print(f"   full reparse {elapsed * 1000:8.0f} ms")
+        assert ast_equal(ast, expected)
+
+
+def bench_batch(files=200, size=16 * 1024):
+    with tempfile.TemporaryDirectory() as directory:
+        paths = []
+        for index in range(files):
+            path = os.path.join(directory, f"program{index}.txt")
+            with open(path, 'w') as source:
+                source.write(generate_source(size))
+            paths.append(path)
+        megabytes = sum(os.path.getsize(path) for path in paths) / 1e6
+        print(f"Parsing {files} files, {megabytes:.1f} MB")
+        counts = sorted({1, 2, 4, os.cpu_count() or 1})
+        for workers in counts:
+            results, elapsed = measure(lambda: parse_files(paths, workers))
+            assert not any(result.error for result in results)
+            print(f"  {workers:3d} workers: {files / elapsed:8,.0f} files/sec {megabytes / elapsed:6.2f} MB/sec")
+
+
+BENCHMARKS = {
+    'tokenize': bench_tokenize,
+    'token_memory': bench_token_memory,
+    'nesting': bench_nesting,
+    'arena': bench_arena,
+    'evaluate': bench_evaluate,
+    'vectorize': bench_vectorize,
+    'incremental': bench_incremental,
+    'batch': bench_batch,
+}
+
+if __name__ == "__main__":
+    for name in sys.argv[1:] or BENCHMARKS:
+        BENCHMARKS[name]()
@@ -0,0 +1,245 @@
+from lexer import Lexer, Token
+from parser import Parser, Block, ForLoop
+
+class PieceParser(Parser):
+    """Parser that records the token range of every statement it builds.
+
+    `levels[0]` ends up holding one (statement, first, end, nested) entry per
+    outermost statement: the statement, its token range [first, end), and
+    the entries of the statements directly inside it.
+    """
+
+    def __init__(self, tokens):
+        super().__init__(tokens)
+        self.levels = [[]]
+
+    def parse_statement(self):
+        first = self.pos
+        self.levels.append([])
+        statement = super().parse_statement()
+        nested = self.levels.pop()
+        self.levels[-1].append((statement, first, self.pos, nested))
+        return statement
+
+def statements_of(node):
+    """The statement list directly inside a Block or ForLoop."""
+    if isinstance(node, ForLoop):
+        return node.body.statements
+    if isinstance(node, Block):
+        return node.statements
+    return ()
+
+class Lengths:
+    """Prefix sums over a fixed number of lengths, kept as a Fenwick tree.
+
+    Changing one length and finding the item that holds an offset both take
+    O(log n), so a block's statements are located and resized without
+    touching their siblings.
+    """
+
+    def __init__(self, lengths):
+        self.tree = tree = [0]
+        tree.extend(lengths)
+        for index in range(1, len(tree)):
+            parent = index + (index & -index)
+            if parent < len(tree):
+                tree[parent] += tree[index]
+
+    def add(self, index, delta):
+        tree = self.tree
+        index += 1
+        while index < len(tree):
+            tree[index] += delta
+            index += index & -index
+
+    def find(self, offset):
+        """(index, start) of the item spanning `offset`, or (None, total) past the last one."""
+        tree = self.tree
+        position = start = 0
+        step = (1 << (len(tree) - 1).bit_length()) >> 1
+        while step:
+            following = position + step
+            if following < len(tree) and start + tree[following] <= offset:
+                position = following
+                start += tree[following]
+            step >>= 1
+        if position == len(tree) - 1:
+            return None, start
+        return position, start
+
+class Piece:
+    """One statement's share of the source: its text, tokens and nested statements.
+
+    The text of a piece is `head`, then the texts of its `children` (the
+    statements directly inside it), then `tail`; a statement that holds no
+    others is all head. A piece runs up to the next statement, trailing
+    whitespace included, so the pieces of a block tile its text. Head tokens
+    are stored relative to the start of the piece and tail tokens relative
+    to the start of the tail, so an edit never moves the tokens of any other
+    piece.
+    """
+
+    __slots__ = ('statement', 'head', 'head_tokens', 'children', 'lengths', 'tail', 'tail_tokens', 'length')
+
+    def __init__(self, statement, head, head_tokens, children, tail, tail_tokens):
+        self.statement = statement
+        self.head = head
+        self.head_tokens = head_tokens
+        self.children = children
+        self.lengths = Lengths(child.length for child in children) if children else None
+        self.tail = tail
+        self.tail_tokens = tail_tokens
+        self.length = len(head) + sum(child.length for child in children) + len(tail)
+
+    def text(self):
+        parts = []
+        pending = [self]
+        while pending:
+            piece = pending.pop()
+            if isinstance(piece, str):
+                parts.append(piece)
+                continue
+            parts.append(piece.head)
+            pending.append(piece.tail)
+            pending.extend(reversed(piece.children))
+        return "".join(parts)
+
+    def tokens(self, base=0):
+        """Yields copies of the tokens with spans counted from `base`."""
+        for token in self.head_tokens:
+            yield Token(token.type, token.value, base + token.start, base + token.end)
+        offset = base + len(self.head)
+        for child in self.children:
+            yield from child.tokens(offset)
+            offset += child.length
+        for token in self.tail_tokens:
+            yield Token(token.type, token.value, offset + token.start, offset + token.end)
+
+def make_piece(entry, start, stop, tokens, text):
+    """Builds the Piece of a PieceParser entry that spans text[start:stop].
+
+    Token spans are rebased in place; every token belongs to exactly one
+    piece and is moved once.
+    """
+    statement, first, end, nested = entry
+    # Read before any child rebases its tokens.
+    bounds = [(tokens[child[1]].start, tokens[child[2]].start) for child in nested]
+    children = [make_piece(child, child_start, child_stop, tokens, text)
+                for child, (child_start, child_stop) in zip(nested, bounds)]
+    if nested:
+        head_stop, tail_start = bounds[0][0], bounds[-1][1]
+        head_tokens, tail_tokens = tokens[first:nested[0][1]], tokens[nested[-1][2]:end]
+    else:
+        head_stop = tail_start = stop
+        head_tokens, tail_tokens = tokens[first:end], []
+    for token in head_tokens:
+        token.start -= start
+        token.end -= start
+    for token in tail_tokens:
+        token.start -= tail_start
+        token.end -= tail_start
+    return Piece(statement, text[start:head_stop], head_tokens, children, text[tail_start:stop], tail_tokens)
+
+def parse_piece(text):
+    """Parses `text` as exactly one statement; returns its Piece, or None if it is not one."""
+    try:
+        tokens = Lexer(text).tokenize()
+        parser = PieceParser(tokens)
+        parser.parse_statement()
+    except Exception:
+        return None
+    if parser.current() is not None:
+        return None
+    return make_piece(parser.levels[0][0], 0, len(text), tokens, text)
+
+class Document:
+    """A program kept lexed and parsed across text edits.
+
+    The source is held as a tree of Pieces that mirrors the statements of the
+    AST. edit() walks down to the innermost statement holding the edited
+    characters, re-lexes and re-parses that statement's text alone, and puts
+    the result in its place; if the edited text is no longer exactly one
+    statement it tries the enclosing one, and falls back to a full parse at
+    the top level. Every other statement, its Block subtrees and its tokens
+    are kept as they are; the statement lists along the path are updated in
+    place, so the returned AST is the same Block object as before.
+
+    An edit costs the size of the re-parsed statement plus O(log n) per
+    enclosing block. `text` and `tokens` are assembled on request.
+    """
+
+    def __init__(self, text):
+        self.full_parse(text)
+
+    def full_parse(self, text):
+        # While the text does not parse it is kept as is, and every edit parses it again.
+        self.source = text
+        self.root = self.ast = None
+        tokens = Lexer(text).tokenize()
+        parser = PieceParser(tokens)
+        ast = parser.parse()
+        self.root = make_piece((ast, 0, len(tokens), parser.levels[0]), 0, len(text), tokens, text)
+        self.ast = ast
+        self.source = None
+        return ast
+
+    @property
+    def text(self):
+        return self.source if self.root is None else self.root.text()
+
+    @property
+    def tokens(self):
+        """The token list of the current text, spans counted from its start."""
+        if self.root is None:
+            return Lexer(self.source).tokenize()
+        return list(self.root.tokens())
+
+    def edit(self, offset, deleted, inserted):
+        """Replaces `deleted` characters at `offset` with `inserted`; returns the new AST."""
+        if self.root is not None:
+            path = self.locate(offset, offset + deleted)
+            for depth in range(len(path) - 1, 0, -1):
+                piece, start, _ = path[depth]
+                text = piece.text()
+                relative = offset - start
+                replacement = parse_piece(text[:relative] + inserted + text[relative + deleted:])
+                if replacement is not None:
+                    self.replace(path[:depth + 1], replacement)
+                    return self.ast
+        text = self.text
+        return self.full_parse(text[:offset] + inserted + text[offset + deleted:])
+
+    def locate(self, start, stop):
+        """The pieces holding characters [start, stop), outermost first.
+
+        Each entry is (piece, offset of the piece, index in its parent).
+        """
+        piece, offset, index = self.root, 0, None
+        path = []
+        while True:
+            path.append((piece, offset, index))
+            if not piece.children:
+                return path
+            body = offset + len(piece.head)
+            if start < body:
+                return path
+            index, child_offset = piece.lengths.find(start - body)
+            if index is None:
+                return path
+            child = piece.children[index]
+            child_offset += body
+            if stop > child_offset + child.length:
+                return path
+            piece, offset = child, child_offset
+
+    def replace(self, path, replacement):
+        """Puts `replacement` in place of the last piece of `path` and resizes the pieces above it."""
+        piece, _, index = path[-1]
+        parent = path[-2][0]
+        parent.children[index] = replacement
+        statements_of(parent.statement)[index] = replacement.statement
+        delta = replacement.length - piece.length
+        if delta:
+            for (ancestor, _, _), (_, _, child_index) in zip(path, path[1:]):
+                ancestor.length += delta
+                ancestor.lengths.add(child_index, delta)
@@ -0,0 +1,180 @@
+import math
+import operator
+
+from lexer import TokenType
+from parser import Number, Variable, BinaryOp, Assignment, FunctionCall, Block, ForLoop
+
+def cot(x):
+    # Only x == 0 gets here with tangent == 0 (tan of a float multiple of pi is
+    # never exactly 0), and it gives an infinity signed like the zero rather
+    # than a ZeroDivisionError: cot(0.0) is +inf and cot(-0.0) is -inf.
+    tangent = math.tan(x)
+    return 1 / tangent if tangent else math.copysign(math.inf, tangent)
+
+BUILTINS = {
+    'sin': math.sin,
+    'cos': math.cos,
+    'tan': math.tan,
+    'cot': cot,
+}
+
+OPERATORS = {
+    TokenType.PLUS: operator.add,
+    TokenType.MINUS: operator.sub,
+    TokenType.MULTIPLY: operator.mul,
+    TokenType.DIVIDE: operator.truediv,
+    TokenType.LESS: operator.lt,
+    TokenType.LESSEQUAL: operator.le,
+    TokenType.GREATER: operator.gt,
+    TokenType.GREATEREQUAL: operator.ge,
+    TokenType.EQUAL: operator.eq,
+}
+
+def number_value(value):
+    """The lexer keeps integer literals as their source text; floats are already parsed."""
+    return int(value) if isinstance(value, str) else value
+
+def builtin(name):
+    if name not in BUILTINS:
+        raise NameError(f"Unknown function {name}")
+    return BUILTINS[name]
+
+def operation(op):
+    if op not in OPERATORS:
+        raise ValueError(f"Unsupported operator {op}")
+    return OPERATORS[op]
+
+# Programs run against a variable environment (a dict). A function call used
+# as a statement appends its result to the output list, like a print.
+
+class Interpreter:
+    """Runs an AST by walking it, dispatching on the node type at every step."""
+
+    def __init__(self, env=None):
+        self.env = dict(env or {})
+        self.output = []
+
+    def evaluate(self, node):
+        if isinstance(node, Number):
+            return number_value(node.value)
+        if isinstance(node, Variable):
+            if node.name not in self.env:
+                raise NameError(f"Undefined variable {node.name}")
+            return self.env[node.name]
+        if isinstance(node, BinaryOp):
+            return operation(node.op)(self.evaluate(node.left), self.evaluate(node.right))
+        if isinstance(node, FunctionCall):
+            return builtin(node.name)(self.evaluate(node.argument))
+        raise TypeError(f"Cannot evaluate {node}")
+
+    def execute(self, node):
+        if isinstance(node, Block):
+            for statement in node.statements:
+                self.execute(statement)
+        elif isinstance(node, Assignment):
+            self.env[node.target.name] = self.evaluate(node.value)
+        elif isinstance(node, ForLoop):
+            self.execute(node.init)
+            while self.evaluate(node.condition):
+                self.execute(node.body)
+                self.execute(node.update)
+        elif isinstance(node, FunctionCall):
+            self.output.append(self.evaluate(node))
+        else:
+            raise TypeError(f"Cannot execute {node}")
+
+def interpret(ast, env=None):
+    """Runs `ast` with the tree-walking Interpreter; returns (env, output)."""
+    interpreter = Interpreter(env)
+    interpreter.execute(ast)
+    return interpreter.env, interpreter.output
+
+class Compiler:
+    """Translates an AST into nested Python closures, once.
+
+    Node types, operators and builtins are resolved at compile time, so running
+    the result only calls closures. Expressions compile to fn(env) and
+    statements to fn(env, output).
+    """
+
+    def compile_expression(self, node):
+        return getattr(self, 'compile_' + type(node).__name__)(node)
+
+    def compile_statement(self, node):
+        if isinstance(node, FunctionCall):
+            call = self.compile_FunctionCall(node)
+
+            def call_statement(env, output):
+                output.append(call(env))
+            return call_statement
+        return getattr(self, 'compile_' + type(node).__name__)(node)
+
+    def compile_Number(self, node):
+        value = number_value(node.value)
+        return lambda env: value
+
+    def compile_Variable(self, node):
+        # A missing name raises KeyError here; run() reports it as a NameError.
+        name = node.name
+        return lambda env: env[name]
+
+    def compile_BinaryOp(self, node):
+        op = operation(node.op)
+        left = self.compile_expression(node.left)
+        if isinstance(node.right, Number):
+            constant = number_value(node.right.value)
+            return lambda env: op(left(env), constant)
+        right = self.compile_expression(node.right)
+        return lambda env: op(left(env), right(env))
+
+    def compile_FunctionCall(self, node):
+        function = builtin(node.name)
+        argument = self.compile_expression(node.argument)
+        return lambda env: function(argument(env))
+
+    def compile_Assignment(self, node):
+        name = node.target.name
+        value = self.compile_expression(node.value)
+
+        def assignment(env, output):
+            env[name] = value(env)
+        return assignment
+
+    def compile_Block(self, node):
+        statements = tuple(self.compile_statement(statement) for statement in node.statements)
+
+        def block(env, output):
+            for statement in statements:
+                statement(env, output)
+        return block
+
+    def compile_ForLoop(self, node):
+        init = self.compile_statement(node.init)
+        condition = self.compile_expression(node.condition)
+        update = self.compile_statement(node.update)
+        body = self.compile_statement(node.body)
+
+        def for_loop(env, output):
+            init(env, output)
+            while condition(env):
+                body(env, output)
+                update(env, output)
+        return for_loop
+
+def compile_program(ast, compiler=None):
+    """Compiles `ast` once; the returned run(env=None) gives (env, output) per call.
+
+    `output` may be any container with append/extend, e.g. array('d') for
+    long-running numeric programs.
+    """
+    program = (compiler or Compiler()).compile_statement(ast)
+
+    def run(env=None, output=None):
+        env = dict(env or {})
+        output = [] if output is None else output
+        try:
+            program(env, output)
+        except KeyError as error:
+            raise NameError(f"Undefined variable {error.args[0]}") from None
+        return env, output
+    return run
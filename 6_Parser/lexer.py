@@ -1,4 +1,7 @@
+import codecs
 import re
+from array import array
+from bisect import bisect_right
 from enum import Enum, auto
 
 class TokenType(Enum):
@@ -55,37 +58,149 @@ TOKEN_REGEX = [
 ]
 
 class Token:
-    def __init__(self, type_, value=None):
+    __slots__ = ('type', 'value', 'start', 'end')
+
+    def __init__(self, type_, value=None, start=None, end=None):
         self.type = type_
         self.value = value
+        # Source span [start, end) in characters, when the lexer knows it.
+        self.start = start
+        self.end = end
 
     def __repr__(self):
         return f"Token({self.type}, {repr(self.value)})"
 
+# TokenType members by their integer value, for decoding TokenBuffer codes.
+TYPES_BY_CODE = [None] + list(TokenType)
+
+def line_col(line_starts, offset):
+    """1-based (line, column) of `offset`, given the sorted offsets where lines start."""
+    line = bisect_right(line_starts, offset)
+    return line, offset - line_starts[line - 1] + 1
+
+class TokenBuffer:
+    """Struct-of-arrays token store: type codes and source spans in typed arrays.
+
+    Token values are sliced from the source on access, so a token costs a few
+    bytes until it is looked at.
+    """
+
+    def __init__(self, text):
+        self.text = text
+        self.types = array('B')
+        self.starts = array('I')
+        self.ends = array('I')
+        self.line_starts = None
+
+    def append(self, type_, start, end):
+        self.types.append(type_.value)
+        self.starts.append(start)
+        self.ends.append(end)
+
+    def __len__(self):
+        return len(self.types)
+
+    def __getitem__(self, index):
+        type_ = TYPES_BY_CODE[self.types[index]]
+        start = self.starts[index]
+        end = self.ends[index]
+        value = self.text[start:end]
+        if type_ == TokenType.NUMBER and '.' in value:
+            value = float(value)
+        return Token(type_, value, start, end)
+
+    def __iter__(self):
+        for index in range(len(self.types)):
+            yield self[index]
+
+    def line_col(self, offset):
+        if self.line_starts is None:
+            self.line_starts = array('I', [0])
+            self.line_starts.extend(m.end() for m in re.finditer('\n', self.text))
+        return line_col(self.line_starts, offset)
+
+# One alternation with a capturing group per TOKEN_REGEX entry, compiled once.
+# Alternatives are tried in list order, so priorities match the table above.
+MASTER_REGEX = re.compile('|'.join(f'({regex})' for regex, _ in TOKEN_REGEX))
+GROUP_TYPES = [None] + [type_ for _, type_ in TOKEN_REGEX]
+
+# A match that ends this close to the end of a partial buffer may still grow
+# (`1` -> `1.5`, `<` -> `<=`, identifiers), so it is held back until more
+# input arrives.
+LOOKAHEAD = 2
+CHUNK_SIZE = 1 << 16
+
+def make_token(type_, value, start=None, end=None):
+    if type_ == 'IDENTIFIER_OR_KEYWORD':
+        return Token(KEYWORDS.get(value, TokenType.IDENTIFIER), value, start, end)
+    val = float(value) if type_ == TokenType.NUMBER and '.' in value else value
+    return Token(type_, val, start, end)
+
 class Lexer:
     def __init__(self, text):
         self.text = text
 
+    def iter_tokens(self):
+        text = self.text
+        match_at = MASTER_REGEX.match
+        pos = 0
+        end = len(text)
+        while pos < end:
+            match = match_at(text, pos)
+            if not match:
+                raise ValueError(f"Illegal character at position {pos}: {text[pos]}")
+            type_ = GROUP_TYPES[match.lastindex]
+            if type_:
+                yield make_token(type_, match.group(), pos, match.end())
+            pos = match.end()
+
     def tokenize(self):
-        tokens = []
+        return list(self.iter_tokens())
+
+    def tokenize_buffer(self):
+        """Tokenizes into a compact TokenBuffer instead of a list of Token objects."""
+        buffer = TokenBuffer(self.text)
+        append = buffer.append
+        text = self.text
+        match_at = MASTER_REGEX.match
+        pos = 0
+        end = len(text)
+        while pos < end:
+            match = match_at(text, pos)
+            if not match:
+                raise ValueError(f"Illegal character at position {pos}: {text[pos]}")
+            type_ = GROUP_TYPES[match.lastindex]
+            if type_:
+                if type_ == 'IDENTIFIER_OR_KEYWORD':
+                    type_ = KEYWORDS.get(match.group(), TokenType.IDENTIFIER)
+                append(type_, pos, match.end())
+            pos = match.end()
+        return buffer
+
+def stream_tokens(stream, chunk_size=CHUNK_SIZE):
+    """Lazily tokenizes a file object or mmap, reading it chunk by chunk."""
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    match_at = MASTER_REGEX.match
+    buffer = ''
+    offset = 0
+    eof = False
+    while not eof:
+        chunk = stream.read(chunk_size)
+        eof = not chunk
+        if isinstance(chunk, bytes):
+            chunk = decoder.decode(chunk, final=eof)
+        buffer = buffer + chunk if buffer else chunk
+        limit = len(buffer) if eof else len(buffer) - LOOKAHEAD
         pos = 0
-        while pos < len(self.text):
-            match = None
-            for regex, type_ in TOKEN_REGEX:
-                pattern = re.compile(regex)
-                match = pattern.match(self.text, pos)
-                if match:
-                    value = match.group(0)
-                    if type_:
-                        if type_ == 'IDENTIFIER_OR_KEYWORD':
-                            token_type = KEYWORDS.get(value, TokenType.IDENTIFIER)
-                            tokens.append(Token(token_type, value))
-                        else:
-                            val = float(value) if type_ == TokenType.NUMBER and '.' in value else value
-                            tokens.append(Token(type_, val))
-                    break
+        while pos < limit:
+            match = match_at(buffer, pos)
             if not match:
-                raise ValueError(f"Illegal character at position {pos}: {self.text[pos]}")
-            else:
-                pos = match.end()
-        return tokens
+                raise ValueError(f"Illegal character at position {offset + pos}: {buffer[pos]}")
+            if match.end() > limit:
+                break
+            type_ = GROUP_TYPES[match.lastindex]
+            if type_:
+                yield make_token(type_, match.group(), offset + pos, offset + match.end())
+            pos = match.end()
+        buffer = buffer[pos:]
+        offset += pos
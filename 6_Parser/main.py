@@ -1,5 +1,8 @@
-from lexer import Lexer
+import sys
+
+from lexer import Lexer, stream_tokens
 from parser import Parser
+from interpreter import compile_program
 
 #code = "for (i = 0; i <= 10; i = i + 1) { sin(i); cos(i); tan(i); cot(i); if (x > y) { x = y; } }"
 code = """
@@ -14,10 +17,21 @@ code = """
 }
 """
 
-lexer = Lexer(code)
-tokens = lexer.tokenize()
+if len(sys.argv) > 1:
+    # Large programs are lexed lazily from the file instead of held in memory.
+    with open(sys.argv[1]) as source:
+        parser = Parser(stream_tokens(source))
+        ast = parser.parse()
+else:
+    lexer = Lexer(code)
+    tokens = lexer.tokenize()
 
-parser = Parser(tokens)
-ast = parser.parse()
+    parser = Parser(tokens)
+    ast = parser.parse()
 
 print(ast)
+
+run = compile_program(ast)
+env, output = run({'x': 0})
+print("\nVariables:", env)
+print("Output:", output)
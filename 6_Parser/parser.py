@@ -61,32 +61,55 @@ class ForLoop(ASTNode):
                 f"update={self.update}, body={self.body})")
 
 class Parser:
-    def __init__(self, tokens):
-        self.tokens = tokens
+    def __init__(self, tokens, arena=None):
+        # Any iterable works: a token list or a lazy stream such as stream_tokens().
+        self.tokens = iter(tokens)
+        self.lookahead = next(self.tokens, None)
         self.pos = 0
+        # A TokenBuffer can turn offsets into line/column for error messages.
+        self.line_col = getattr(tokens, 'line_col', None)
+        # With an ASTArena, nodes are stored flat and referred to by integer id.
+        self.arena = arena
+
+    def make(self, cls, start, *fields):
+        # `start` is the index of the node's first token; only the arena keeps it.
+        if self.arena is None:
+            return cls(*fields)
+        return self.arena.add(cls, start, *fields)
+
+    def where(self, token):
+        if token is None or token.start is None:
+            return ""
+        if self.line_col is None:
+            return f" at position {token.start}"
+        line, column = self.line_col(token.start)
+        return f" at line {line}, column {column}"
 
     def current(self):
-        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+        return self.lookahead
 
     def consume(self, type_):
-        token = self.current()
+        token = self.lookahead
         if token and token.type == type_:
+            self.lookahead = next(self.tokens, None)
             self.pos += 1
             return token
-        raise Exception(f"Expected {type_} but got {token}")
+        raise Exception(f"Expected {type_} but got {token}{self.where(token)}")
 
     def parse_number(self):
+        start = self.pos
         token = self.consume(TokenType.NUMBER)
-        return Number(token.value)
+        return self.make(Number, start, token.value)
 
     def parse_variable_or_function(self):
+        start = self.pos
         name = self.consume(TokenType.IDENTIFIER).value
         if self.current() and self.current().type == TokenType.LPAREN:
             self.consume(TokenType.LPAREN)
             arg = self.parse_expression()
             self.consume(TokenType.RPAREN)
-            return FunctionCall(name, arg)
-        return Variable(name)
+            return self.make(FunctionCall, start, name, arg)
+        return self.make(Variable, start, name)
 
     def parse_factor(self):
         token = self.current()
@@ -99,37 +122,41 @@ class Parser:
             expr = self.parse_expression()
             self.consume(TokenType.RPAREN)
             return expr
-        raise Exception(f"Unexpected token {token}")
+        raise Exception(f"Unexpected token {token}{self.where(token)}")
 
     def parse_term(self):
+        start = self.pos
         node = self.parse_factor()
         while self.current() and self.current().type in (TokenType.MULTIPLY, TokenType.DIVIDE):
             op = self.consume(self.current().type)
             right = self.parse_factor()
-            node = BinaryOp(node, op.type, right)
+            node = self.make(BinaryOp, start, node, op.type, right)
         return node
 
     def parse_expression(self):
+        start = self.pos
         node = self.parse_term()
         while self.current() and self.current().type in (TokenType.PLUS, TokenType.MINUS):
             op = self.consume(self.current().type)
             right = self.parse_term()
-            node = BinaryOp(node, op.type, right)
+            node = self.make(BinaryOp, start, node, op.type, right)
         return node
 
     def parse_assignment(self):
+        start = self.pos
         var_name = self.consume(TokenType.IDENTIFIER).value
         self.consume(TokenType.EQUAL)
         expr = self.parse_expression()
-        return Assignment(Variable(var_name), expr)
+        return self.make(Assignment, start, self.make(Variable, start, var_name), expr)
 
     def parse_condition(self):
+        start = self.pos
         left = self.parse_expression()
         op = self.consume(self.current().type)
         right = self.parse_expression()
-        return BinaryOp(left, op.type, right)
+        return self.make(BinaryOp, start, left, op.type, right)
 
-    def parse_for_loop(self):
+    def parse_for_header(self):
         self.consume(TokenType.FOR)
         self.consume(TokenType.LPAREN)
         init = self.parse_assignment()
@@ -138,10 +165,16 @@ class Parser:
         self.consume(TokenType.SEMICOLON)
         update = self.parse_assignment()
         self.consume(TokenType.RPAREN)
+        return init, condition, update
+
+    def parse_for_loop(self):
+        start = self.pos
+        init, condition, update = self.parse_for_header()
         body = self.parse_block()
-        return ForLoop(init, condition, update, body)
+        return self.make(ForLoop, start, init, condition, update, body)
 
     def parse_statement(self):
+        start = self.pos
         token = self.current()
         if token.type == TokenType.FOR:
             return self.parse_for_loop()
@@ -155,17 +188,124 @@ class Parser:
             arg = self.parse_expression()
             self.consume(TokenType.RPAREN)
             self.consume(TokenType.SEMICOLON)
-            return FunctionCall(func_token.type.name.lower(), arg)
+            return self.make(FunctionCall, start, func_token.type.name.lower(), arg)
         else:
-            raise Exception(f"Unknown statement starting with {token}")
+            raise Exception(f"Unknown statement starting with {token}{self.where(token)}")
 
     def parse_block(self):
+        start = self.pos
         self.consume(TokenType.LBRACE)
         statements = []
         while self.current() and self.current().type != TokenType.RBRACE:
             statements.append(self.parse_statement())
         self.consume(TokenType.RBRACE)
-        return Block(statements)
+        return self.make(Block, start, statements)
 
     def parse(self):
         return self.parse_block()
+
+# Binding strength of the binary operators accepted inside expressions.
+PRECEDENCE = {
+    TokenType.PLUS: 1,
+    TokenType.MINUS: 1,
+    TokenType.MULTIPLY: 2,
+    TokenType.DIVIDE: 2,
+}
+
+class IterativeParser(Parser):
+    """Parses the same grammar as Parser into identical trees without recursion.
+
+    Expressions use operator precedence with explicit operand/operator stacks,
+    and nested blocks are tracked on a block stack, so nesting depth is limited
+    only by memory.
+    """
+
+    def reduce(self, operands, starts, operators):
+        right = operands.pop()
+        left = operands.pop()
+        starts.pop()
+        operands.append(self.make(BinaryOp, starts[-1], left, operators.pop(), right))
+
+    def parse_expression(self):
+        operands = []
+        # starts[i]: index of the first token of operands[i], parentheses included.
+        starts = []
+        # Holds operator TokenTypes, plus (name, start) markers for open
+        # parentheses; name is the called function, or None for plain grouping,
+        # and start is the index of the name or of the '('.
+        operators = []
+        open_parens = 0
+        expect_operand = True
+        while True:
+            token = self.current()
+            type_ = token.type if token else None
+            if expect_operand:
+                start = self.pos
+                if type_ == TokenType.NUMBER:
+                    operands.append(self.parse_number())
+                    starts.append(start)
+                    expect_operand = False
+                elif type_ == TokenType.IDENTIFIER:
+                    name = self.consume(TokenType.IDENTIFIER).value
+                    if self.current() and self.current().type == TokenType.LPAREN:
+                        self.consume(TokenType.LPAREN)
+                        operators.append((name, start))
+                        open_parens += 1
+                    else:
+                        operands.append(self.make(Variable, start, name))
+                        starts.append(start)
+                        expect_operand = False
+                elif type_ == TokenType.LPAREN:
+                    self.consume(TokenType.LPAREN)
+                    operators.append((None, start))
+                    open_parens += 1
+                else:
+                    raise Exception(f"Unexpected token {token}{self.where(token)}")
+            elif type_ in PRECEDENCE:
+                precedence = PRECEDENCE[type_]
+                while operators and type(operators[-1]) is TokenType and PRECEDENCE[operators[-1]] >= precedence:
+                    self.reduce(operands, starts, operators)
+                operators.append(self.consume(type_).type)
+                expect_operand = True
+            elif type_ == TokenType.RPAREN and open_parens:
+                while type(operators[-1]) is TokenType:
+                    self.reduce(operands, starts, operators)
+                name, start = operators.pop()
+                open_parens -= 1
+                self.consume(TokenType.RPAREN)
+                if name is not None:
+                    operands.append(self.make(FunctionCall, start, name, operands.pop()))
+                starts[-1] = start
+            else:
+                break
+
+        while operators:
+            if type(operators[-1]) is not TokenType:
+                # An unclosed parenthesis: fail the way Parser does.
+                self.consume(TokenType.RPAREN)
+            self.reduce(operands, starts, operators)
+        return operands[-1]
+
+    def parse(self):
+        start = self.pos
+        self.consume(TokenType.LBRACE)
+        # One entry per open block: the enclosing for-loop header (None for the
+        # outermost block), the indices of the loop's 'for' and of the block's
+        # '{', and the statements parsed so far.
+        blocks = [(None, None, start, [])]
+        while True:
+            token = self.current()
+            if token is None or token.type == TokenType.RBRACE:
+                self.consume(TokenType.RBRACE)
+                header, loop_start, block_start, statements = blocks.pop()
+                block = self.make(Block, block_start, statements)
+                if header is None:
+                    return block
+                blocks[-1][3].append(self.make(ForLoop, loop_start, *header, block))
+            elif token.type == TokenType.FOR:
+                loop_start = self.pos
+                header = self.parse_for_header()
+                blocks.append((header, loop_start, self.pos, []))
+                self.consume(TokenType.LBRACE)
+            else:
+                blocks[-1][3].append(self.parse_statement())
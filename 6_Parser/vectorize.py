@@ -0,0 +1,278 @@
+import math
+import operator
+from array import array
+
+from lexer import TokenType
+from parser import Number, Variable, BinaryOp, FunctionCall, Block
+from interpreter import Compiler, compile_program, number_value, operation
+
+try:
+    import numpy as np
+except ImportError:  # the scalar closures still work without numpy
+    np = None
+
+COMPARISONS = {
+    TokenType.LESS: operator.lt,
+    TokenType.LESSEQUAL: operator.le,
+    TokenType.GREATER: operator.gt,
+    TokenType.GREATEREQUAL: operator.ge,
+}
+
+# Integers up to this magnitude are exact as float64.
+FLOAT_EXACT = 2 ** 53
+# Iterations evaluated per NumPy pass.
+BLOCK = 1 << 20
+
+if np is not None:
+    VECTOR_BUILTINS = {
+        'sin': np.sin,
+        'cos': np.cos,
+        'tan': np.tan,
+        'cot': lambda x: 1 / np.tan(x),
+    }
+
+    VECTOR_OPERATORS = {
+        TokenType.PLUS: np.add,
+        TokenType.MINUS: np.subtract,
+        TokenType.MULTIPLY: np.multiply,
+        TokenType.DIVIDE: np.divide,
+    }
+
+class Fallback(Exception):
+    """The vector path would not reproduce scalar behaviour; run the loop normally."""
+
+def uses(node, name):
+    """Whether expression `node` reads variable `name`."""
+    pending = [node]
+    while pending:
+        node = pending.pop()
+        if isinstance(node, Variable) and node.name == name:
+            return True
+        if isinstance(node, BinaryOp):
+            pending.extend((node.left, node.right))
+        elif isinstance(node, FunctionCall):
+            pending.append(node.argument)
+    return False
+
+def is_vector_expression(node):
+    pending = [node]
+    while pending:
+        node = pending.pop()
+        if isinstance(node, BinaryOp):
+            if node.op not in VECTOR_OPERATORS:
+                return False
+            pending.extend((node.left, node.right))
+        elif isinstance(node, FunctionCall):
+            if node.name not in VECTOR_BUILTINS:
+                return False
+            pending.append(node.argument)
+        elif not isinstance(node, (Number, Variable)):
+            return False
+    return True
+
+def affine_loop(node):
+    """Matches `for (i = a; i <op> b; i = i +/- c) { builtin(expr); ... }`.
+
+    Returns (name, start, comparison, bound, update op, step, calls) or None.
+    The body may only contain builtin call statements, so no variable changes
+    inside the loop and iterations are independent; a, b and c may be any
+    expression that does not read i.
+    """
+    init, condition, update, body = node.init, node.condition, node.update, node.body
+    if not isinstance(init.target, Variable):
+        return None
+    name = init.target.name
+    if uses(init.value, name):
+        return None
+    if not (isinstance(condition, BinaryOp) and condition.op in COMPARISONS
+            and isinstance(condition.left, Variable) and condition.left.name == name
+            and not uses(condition.right, name)):
+        return None
+    step = update.value
+    if not (update.target.name == name and isinstance(step, BinaryOp)
+            and step.op in (TokenType.PLUS, TokenType.MINUS)
+            and isinstance(step.left, Variable) and step.left.name == name
+            and not uses(step.right, name)):
+        return None
+    if not isinstance(body, Block):
+        return None
+    for statement in body.statements:
+        if not (isinstance(statement, FunctionCall) and is_vector_expression(statement)):
+            return None
+    return name, init.value, condition.op, condition.right, step.op, step.right, body.statements
+
+class VectorizingCompiler(Compiler):
+    """Compiler that runs affine builtin-only for loops as NumPy array operations.
+
+    The iteration space is evaluated in blocks of BLOCK iterations, so memory
+    does not grow with the trip count. Integer arithmetic stays exact: a
+    block whose integer values could leave float64's exact range, like one
+    that would make NumPy diverge from the scalar closures (non-terminating
+    bounds, division by zero, non-finite builtin arguments), is run by the
+    scalar loop from that block on. Values match scalar evaluation up to
+    floating-point rounding of the NumPy kernels.
+    """
+
+    def compile_ForLoop(self, node):
+        match = affine_loop(node) if np is not None else None
+        if match is None:
+            return super().compile_ForLoop(node)
+        name, start, comparison, bound, step_op, step, calls = match
+        start = self.compile_expression(start)
+        bound = self.compile_expression(bound)
+        step = self.compile_expression(step)
+        condition = self.compile_expression(node.condition)
+        update = self.compile_statement(node.update)
+        body = self.compile_statement(node.body)
+        compare = COMPARISONS[comparison]
+        arguments = [(VECTOR_BUILTINS[call.name], call.argument) for call in calls]
+
+        def scalar_from(env, output, position):
+            # The body assigns nothing, so the scalar loop can pick up at any iteration.
+            env[name] = position
+            while condition(env):
+                body(env, output)
+                update(env, output)
+
+        def vector_loop(env, output):
+            first = start(env)
+            limit = bound(env)
+            if not compare(first, limit):
+                # Like the scalar loop: the body and the update are never evaluated.
+                env[name] = first
+                return
+            increment = step(env)
+            if step_op == TokenType.MINUS:
+                increment = -increment
+            position = first
+            try:
+                for values, integral, following in iteration_blocks(first, compare, limit, increment):
+                    with np.errstate(divide='ignore', invalid='ignore'):
+                        results = []
+                        for function, argument in arguments:
+                            argument, _ = evaluate(argument, name, values, integral, env)
+                            if not np.all(np.isfinite(argument)):
+                                raise Fallback
+                            results.append(np.broadcast_to(function(argument), values.shape))
+                    if results:
+                        emit(output, np.column_stack(results).ravel())
+                    position = following
+            except Fallback:
+                return scalar_from(env, output, position)
+            env[name] = position
+        return vector_loop
+
+def iteration_blocks(first, compare, limit, increment):
+    """Yields the values the induction variable takes, BLOCK at a time.
+
+    Each block is (values, integral, following): the values as float64, whether
+    the scalar loop holds them as Python ints, and the value after the block.
+    Raises Fallback where the values would not be exactly the scalar ones.
+    The caller has checked that the loop runs at least once.
+    """
+    increasing = compare in (operator.lt, operator.le)
+    if not increment or (increment > 0) != increasing or (isinstance(limit, float) and not math.isfinite(limit)):
+        raise Fallback  # the scalar loop would never stop
+    if isinstance(first, int) and abs(first) >= FLOAT_EXACT:
+        raise Fallback  # float64 would round it
+    if isinstance(first, int) and isinstance(increment, int):
+        if abs(increment) >= FLOAT_EXACT:
+            raise Fallback
+        if isinstance(limit, int):
+            count = max(0, -((first - limit) // increment))
+        else:
+            count = max(0, math.ceil((limit - first) / increment))
+        while count > 0 and not compare(first + (count - 1) * increment, limit):
+            count -= 1
+        while compare(first + count * increment, limit):
+            count += 1
+        if abs(first + (count - 1) * increment) >= FLOAT_EXACT:
+            raise Fallback  # float64 would round some of the integer values
+        for offset in range(0, count, BLOCK):
+            size = min(BLOCK, count - offset)
+            position = first + offset * increment
+            values = (np.arange(size, dtype=np.int64) * increment + position).astype(np.float64)
+            yield values, True, position + size * increment
+        return
+    if isinstance(limit, int) and abs(limit) >= FLOAT_EXACT:
+        raise Fallback  # comparing with it as float64 could round
+    if isinstance(first, int):
+        # Only the first iteration sees an int; i + increment is a float from then on.
+        position = first + increment
+        yield np.array([first], dtype=np.float64), True, position
+    else:
+        position = first
+    if not compare(position, limit):
+        return
+    # Repeated float addition rounds at every step; accumulate reproduces that
+    # exactly, and carrying the last value into the next block keeps it so.
+    remaining = max(0, math.ceil((limit - position) / increment)) + 3
+    steps = np.full(BLOCK + 1, float(increment))
+    while remaining > 0:
+        steps[0] = position
+        values = np.add.accumulate(steps)
+        stops = np.flatnonzero(~compare(values, limit))
+        if len(stops):
+            stop = stops[0]
+            yield values[:stop], False, float(values[stop])
+            return
+        position = float(values[BLOCK])
+        yield values[:BLOCK], False, position
+        remaining -= BLOCK
+    raise Fallback
+
+def integral_constant(value):
+    """Whether scalar code holds `value` as a Python int; Fallback if float64 could not."""
+    if isinstance(value, int):
+        if abs(value) >= FLOAT_EXACT:
+            raise Fallback
+        return True
+    return False
+
+def evaluate(node, name, values, integral, env):
+    """Evaluates `node` over a block; returns (result, whether scalar code would hold ints).
+
+    Integer +, - and * are exact in scalar code. Their float64 results are
+    exact too while they stay below FLOAT_EXACT, and a result that went past
+    it is at least FLOAT_EXACT after rounding, so checking the magnitude of
+    each one is enough.
+    """
+    if isinstance(node, Number):
+        value = number_value(node.value)
+        return value, integral_constant(value)
+    if isinstance(node, Variable):
+        if node.name == name:
+            return values, integral
+        value = env[node.name]
+        return value, integral_constant(value)
+    if isinstance(node, FunctionCall):
+        argument, _ = evaluate(node.argument, name, values, integral, env)
+        if not np.all(np.isfinite(argument)):
+            raise Fallback
+        return VECTOR_BUILTINS[node.name](argument), False
+    left, left_integral = evaluate(node.left, name, values, integral, env)
+    right, right_integral = evaluate(node.right, name, values, integral, env)
+    if node.op == TokenType.DIVIDE:
+        if np.any(np.asarray(right) == 0):
+            raise Fallback
+        return VECTOR_OPERATORS[node.op](left, right), False
+    if not (isinstance(left, np.ndarray) or isinstance(right, np.ndarray)):
+        # Two loop invariants: compute exactly as the scalar closures do.
+        result = operation(node.op)(left, right)
+        return result, integral_constant(result)
+    result = VECTOR_OPERATORS[node.op](left, right)
+    if left_integral and right_integral:
+        if len(result) and np.abs(result).max() >= FLOAT_EXACT:
+            raise Fallback
+        return result, True
+    return result, False
+
+def emit(output, results):
+    if isinstance(output, array) and output.typecode == 'd':
+        output.frombytes(results.astype(np.float64).tobytes())
+    else:
+        output.extend(results.tolist())
+
+def compile_vectorized(ast):
+    """compile_program() with affine builtin-only loops run through NumPy."""
+    return compile_program(ast, VectorizingCompiler())
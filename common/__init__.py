@@ -0,0 +1,5 @@
+"""Code shared by the lab directories.
+
+Library modules import it as `common`; the labs' entry points (LAB_*.py run
+as a script, benchmark.py) put the repository root on sys.path first.
+"""
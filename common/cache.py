@@ -0,0 +1,89 @@
+import hashlib
+import marshal
+import mmap
+import os
+import struct
+import tempfile
+
+# Bump whenever the file layout or the way tables are built changes; files
+# written under another version are ignored and rebuilt.
+VERSION = 1
+MAGIC = b'FATABLE\0'
+
+# File layout: header, then the table as native int32s (count * width), the
+# accepting flags (count bytes) and the marshalled (states, symbols) names.
+HEADER = struct.Struct('=8sIIIiI')
+
+class TableCache:
+    """Content-addressed on-disk store of compiled transition tables.
+
+    A definition (any repr-able value that fully describes the automaton) is
+    hashed together with VERSION, and the table built from it is written to
+    `<directory>/<hash>.fa`. Loading maps the file back in with mmap, so the
+    table itself is never copied or parsed; only the state and symbol names
+    are unmarshalled. A changed definition hashes to a different file, and a
+    file that is truncated or has the wrong version is rebuilt.
+
+    Tables are loaded as any DenseTable subclass (lab1's CompiledFA, lab2's
+    DenseDFA); each lab tags its definitions, so one directory can serve both.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, definition):
+        data = f"{VERSION}:{definition!r}".encode()
+        return hashlib.sha256(data).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key + '.fa')
+
+    def get(self, definition, cls, build):
+        """The table for `definition` as a `cls`, from disk or from `build()`."""
+        key = self.key(definition)
+        compiled = self.load(key, cls)
+        if compiled is None:
+            compiled = build()
+            self.store(key, compiled)
+        return compiled
+
+    def load(self, key, cls):
+        """Maps the file for `key` back in; None if it is missing or unusable."""
+        try:
+            with open(self.path(key), 'rb') as source:
+                data = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):  # missing, unreadable or empty
+            return None
+        if len(data) < HEADER.size:
+            return None
+        magic, version, count, width, start, names_size = HEADER.unpack_from(data)
+        table_end = HEADER.size + 4 * count * width
+        accepting_end = table_end + count
+        if magic != MAGIC or version != VERSION or len(data) != accepting_end + names_size:
+            return None
+        view = memoryview(data)
+        try:
+            states, symbols = marshal.loads(view[accepting_end:])
+        except (EOFError, ValueError, TypeError):
+            return None
+        table = view[HEADER.size:table_end].cast('i')
+        return cls.from_table(states, symbols, table, view[table_end:accepting_end], start)
+
+    def store(self, key, compiled):
+        names = marshal.dumps((list(compiled.states), list(compiled.symbols)))
+        header = HEADER.pack(MAGIC, VERSION, len(compiled.states), compiled.width, compiled.start, len(names))
+        # Written under a temporary name and renamed, so readers never see a partial file.
+        handle, temporary = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(handle, 'wb') as target:
+            target.write(header)
+            target.write(compiled.table)
+            target.write(compiled.accepting)
+            target.write(names)
+        os.replace(temporary, self.path(key))
+
+    def clear(self):
+        """Removes every cached table."""
+        for name in os.listdir(self.directory):
+            if name.endswith('.fa'):
+                os.remove(os.path.join(self.directory, name))
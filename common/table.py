@@ -0,0 +1,119 @@
+try:
+    import numpy as np
+except ImportError:  # only accepts_many() needs numpy
+    np = None
+
+BATCH_SIZE = 1 << 16
+
+class DenseTable:
+    """A deterministic automaton packed into a flat transition table.
+
+    States and symbols get integer ids (sorted by name). `table` is a flat
+    array('i') with one row of `width` entries per state; each entry holds the
+    next state's row offset (state id * width), or -1 where there is no
+    transition, so stepping is a single index per character. `accepting`
+    holds one flag per state and `start` is the start state's row offset.
+
+    Subclasses build the table from their own automaton format; lab1's
+    CompiledFA and lab2's DenseDFA share everything else from here.
+    """
+
+    @classmethod
+    def from_table(cls, states, symbols, table, accepting, start):
+        """Wraps a table built earlier, e.g. one mapped back in by TableCache.
+
+        `table` and `accepting` can be any int32 / byte sequences laid out as
+        above, such as memoryviews over a file.
+        """
+        dense = cls.__new__(cls)
+        dense.states = states
+        dense.state_ids = {state: index for index, state in enumerate(states)}
+        dense.symbols = symbols
+        dense.symbol_ids = {symbol: index for index, symbol in enumerate(symbols)}
+        dense.width = max(1, len(symbols))
+        dense.table = table
+        dense.accepting = accepting
+        dense.start = start
+        dense.padded = None
+        return dense
+
+    def accepts(self, string):
+        table = self.table
+        symbol_ids = self.symbol_ids
+        row = self.start
+        for symbol in string:
+            column = symbol_ids.get(symbol)
+            if column is None:
+                return False
+            row = table[row + column]
+            if row < 0:
+                return False
+        return bool(self.accepting[row // self.width])
+
+    def accepts_many(self, strings):
+        """accepts() for every string at once; returns a NumPy bool array.
+
+        Strings are encoded, BATCH_SIZE at a time, into a padded matrix of
+        column ids and stepped through the table together, one gather per
+        character position. Symbols must be single characters.
+        """
+        if np is None:
+            raise ImportError("accepts_many() requires numpy")
+        strings = list(strings)
+        if self.padded is None:
+            self.padded = self.padded_table()
+        table, accepting, row_width = self.padded
+        lookup = self.code_point_lookup()
+        start = self.start // self.width * row_width
+        result = np.empty(len(strings), dtype=bool)
+        for first in range(0, len(strings), BATCH_SIZE):
+            batch = strings[first:first + BATCH_SIZE]
+            rows = np.full(len(batch), start, dtype=np.intp)
+            matrix = encode(batch, lookup, self.width)
+            for position in range(matrix.shape[1]):
+                rows = table[rows + matrix[:, position]]
+            result[first:first + len(batch)] = accepting[rows // row_width]
+        return result
+
+    def padded_table(self):
+        """The table for accepts_many(): (flat table, accepting flags, row width).
+
+        It has two extra columns, for characters outside the alphabet and for
+        padding after a string has ended (a self-loop), and an extra dead
+        state that replaces every missing transition.
+        """
+        count = len(self.states)
+        width = self.width
+        row_width = width + 2
+        dead = count * row_width
+        rows = np.frombuffer(self.table, dtype=np.int32).reshape(count, width)
+        matrix = np.full((count + 1, row_width), dead, dtype=np.intp)
+        matrix[:count, :width] = np.where(rows < 0, dead, rows // width * row_width)
+        matrix[:, width + 1] = np.arange(count + 1) * row_width
+        accepting = np.zeros(count + 1, dtype=bool)
+        accepting[:count] = np.frombuffer(self.accepting, dtype=np.uint8).astype(bool)
+        return matrix.ravel(), accepting, row_width
+
+    def code_point_lookup(self):
+        """Maps code points to column ids; anything else maps to `width` (unknown)."""
+        if any(len(symbol) != 1 for symbol in self.symbols):
+            raise ValueError("accepts_many() needs one-character symbols")
+        points = np.array([ord(symbol) for symbol in self.symbols], dtype=np.intp)
+        dtype = np.uint8 if self.width + 2 <= 256 else np.int32
+        lookup = np.full(int(points.max(initial=-1)) + 2, self.width, dtype=dtype)
+        lookup[points] = np.arange(len(self.symbols))
+        return lookup
+
+def encode(strings, lookup, unknown):
+    """Pads `strings` into a (count, longest) matrix of column ids.
+
+    Positions past the end of a string get the padding column, unknown + 1.
+    """
+    lengths = np.fromiter(map(len, strings), dtype=np.intp, count=len(strings))
+    longest = int(lengths.max(initial=0))
+    points = np.frombuffer("".join(strings).encode('utf-32-le'), dtype=np.uint32).astype(np.intp)
+    # The last lookup entry is `unknown`, so clipping covers every other code point.
+    columns = lookup[np.minimum(points, len(lookup) - 1)]
+    matrix = np.full((len(strings), longest), unknown + 1, dtype=lookup.dtype)
+    matrix[np.arange(longest) < lengths[:, None]] = columns
+    return matrix
@@ -1,148 +1,203 @@
+import os
 import random
+import sys
+from itertools import islice
+
+if __name__ == "__main__":
+    # Run as a script from its own directory: make the repository's common package importable.
+    sys.path.insert(1, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from earley import EarleyRecognizer
+from language import Language
+from sampler import UniformSampler
+from automaton import CompiledFA
+from store import GrammarStore
+
+# Draws in a row that may repeat known strings before generate_5_strings gives up.
+STALE_DRAWS = 1000
 
 class Grammar:
-    def __init__(self, Vn, Vt, P, S):
+    def __init__(self, Vn, Vt, P, S, store=None):
         self.Vn = Vn
         self.Vt = Vt
         self.P = P
-        self.P_dictionary = {}
         self.S = S
+        self.store = store or GrammarStore.parse(Vn, Vt, P, S)
+        self.P_dictionary = self.store.rules()
+        self.recognizer = None
+        self.language = None
 
-        pairs = self.P.split(", ")
-        for pair in pairs:
-            a, b = pair.split("->")
-            if "|" in b:
-                rules = b.split("|")
-            else:
-                rules = [b]
-
-            if a in self.P_dictionary:
-                self.P_dictionary[a].extend(rules)
-            else:
-                self.P_dictionary[a] = rules
+    @classmethod
+    def from_store(cls, store):
+        return cls(store.nonterminals(), store.terminals(), store.notation(), store.symbols[store.start], store)
 
     def generate_string(self):
-        string = self.S
+        """A random derivation, rewriting every nonterminal at each step; returns (string, steps)."""
         steps = []
+        form = self.derive(steps)
+        return self.store.text(form), steps
+
+    def random_string(self):
+        """A random derivation's string alone; the sentential forms are never turned into text.
 
-        while any(char in self.Vn for char in string):
-            new_string = ""
-            for char in string:
-                if char in self.P_dictionary:
-                    new_string += random.choice(self.P_dictionary[char])
+        For strings of a chosen length, drawn uniformly, see sampler().
+        """
+        return self.store.text(self.derive())
+
+    def derive(self, steps=None):
+        """Derives from S until only terminals are left and returns that form as ids.
+
+        Each step is appended to `steps` as text, when it is given.
+        """
+        store = self.store
+        productions = store.productions
+        nonterminal = store.nonterminal
+        string = self.S
+        form = [store.start]
+
+        while any(nonterminal[symbol] for symbol in form):
+            new_form = []
+            for symbol in form:
+                if symbol in productions:
+                    new_form += random.choice(productions[symbol])
                 else:
-                    new_string += char
-            steps.append(f"{string} -> {new_string}")
-            string = new_string
+                    new_form.append(symbol)
+            if steps is not None:
+                new_string = store.text(new_form)
+                steps.append(f"{string} -> {new_string}")
+                string = new_string
+            form = new_form
 
-        return string, steps
+        return form
 
     def generate_5_strings(self):
         strings = set()
-
-        while len(strings) < 5:
+        # A language with fewer than 5 words would keep the loop below going forever.
+        # Only right-linear grammars can be listed; for the rest, stop once
+        # STALE_DRAWS draws in a row have found nothing new.
+        try:
+            target = len(list(islice(self.get_language().words(), 5)))
+        except ValueError:
+            target = 5
+
+        stale = 0
+        while len(strings) < target and stale < STALE_DRAWS:
             new_string, steps = self.generate_string()
+            if new_string in strings:
+                stale += 1
+                continue
+            stale = 0
             strings.add(new_string)
             print(f"The steps taken to generate {new_string}: ", steps)
 
         return strings
 
     def reverse_dictionary(self):
-        reversed_P_dictionary = {}
-
-        for key, values in self.P_dictionary.items():
-            for value in values:
-                if value not in reversed_P_dictionary:
-                    reversed_P_dictionary[value] = []
-                reversed_P_dictionary[value].append(key)
-
-        return reversed_P_dictionary
-
-    def check_string(self, string):
-        reversed_P_dictionary = self.reverse_dictionary()
-        current_strings = [list(string)]
-        transitions = []
-
-        while current_strings:
-            new_strings = []
-            for s in current_strings:
-                if "".join(s) == self.S:
-                    transitions.append(f"Valid derivation: {self.S} -> {''.join(string)}")
-                    return transitions
-
-                for i in range(len(s)):
-                    substring = "".join(s[i:i + 2])
-                    if substring in reversed_P_dictionary:
-                        for replacement in reversed_P_dictionary[substring]:
-                            new_string = s[:i] + [replacement] + s[i + 2:]
-                            new_strings.append(new_string)
-                            transitions.append(f"{''.join(s)} <- {''.join(new_string)}")
-
-                    elif s[i] in reversed_P_dictionary:
-                        for replacement in reversed_P_dictionary[s[i]]:
-                            new_string = s[:i] + [replacement] + s[i + 1:]
-                            new_strings.append(new_string)
-                            transitions.append(f"{''.join(s)} <- {''.join(new_string)}")
-
-            current_strings = new_strings
-
-        return ["No valid derivation found."]
+        store = self.store
+        return {store.text(rhs): [store.symbols[lhs] for lhs in lhs_list]
+                for rhs, lhs_list in store.reverse.items()}
+
+    def get_recognizer(self):
+        # Built on first use and reused by every later membership check.
+        if self.recognizer is None:
+            self.recognizer = EarleyRecognizer(self.P_dictionary, self.S, self.Vn)
+        return self.recognizer
+
+    def accepts(self, string):
+        return self.get_recognizer().accepts(string)
+
+    def get_language(self):
+        # Counts and enumerates words; see language.Language.
+        if self.language is None:
+            self.language = Language(self.store)
+        return self.language
+
+    def sampler(self, length, seed=None):
+        """A UniformSampler drawing strings of exactly `length` symbols, all equally likely."""
+        return UniformSampler(self.get_language(), length, seed)
+
+    def enumerate_strings(self, longest=None):
+        """Streams the generated strings in shortlex order, up to `longest` symbols."""
+        return self.get_language().words(longest)
+
+    def count_strings(self, longest):
+        """The number of strings of each length 0..longest, counted without listing them."""
+        return self.get_language().counts(longest)
+
+    def check_string(self, string, trace=False):
+        """Reports whether `string` is derivable from S.
+
+        With `trace`, the steps of a leftmost derivation come first.
+        """
+        recognizer = self.get_recognizer()
+        if not trace:
+            if recognizer.accepts(string):
+                return [f"Valid derivation: {self.S} -> {string}"]
+            return ["No valid derivation found."]
+        steps = recognizer.derivation(string)
+        if steps is None:
+            return ["No valid derivation found."]
+        return steps + [f"Valid derivation: {self.S} -> {string}"]
 
 class FA:
-    def __init__(self, Vn, Vt, P, S):
+    def __init__(self, Vn, Vt, P, S, store=None):
         self.Vn = Vn
         self.Vt = Vt
         self.P = P
         self.S = S
-        self.P_dictionary = {}
-
-        pairs = self.P.split(", ")
-        for pair in pairs:
-            a, b = pair.split("->")
-            if "|" in b:
-                rules = b.split("|")
-            else:
-                rules = [b]
+        self.store = store or GrammarStore.parse(Vn, Vt, P, S)
+        self.P_dictionary = self.store.rules()
+        self.compiled = None
 
-            if a in self.P_dictionary:
-                self.P_dictionary[a].extend(rules)
-            else:
-                self.P_dictionary[a] = rules
+    @classmethod
+    def from_store(cls, store):
+        return cls(store.nonterminals(), store.terminals(), store.notation(), store.symbols[store.start], store)
 
     def convert_grammar_to_fa(self):
         states = set(self.Vn)
         transitions = {}
         accepting_states = set()
         start_state = self.S
+        terminals = set(self.Vt)
 
         for left, right_parts in self.P_dictionary.items():
             for right in right_parts:
-                if len(right) == 1 and right in self.Vt:
+                if len(right) == 1 and right in terminals:
                     accepting_states.add(left)
-                elif len(right) == 2 and right[0] in self.Vt and right[1] in self.Vn:
+                elif len(right) == 2 and right[0] in terminals and right[1] in states:
                     transitions[(left, right[0])] = right[1]
 
         return states, transitions, accepting_states, start_state
 
-    def check_string_via_transition(self, string):
-        states, transitions, accepting_states, current_state = self.convert_grammar_to_fa()
-        steps = [f"Start at {current_state}"]
-
-        for symbol in string:
-            if (current_state, symbol) in transitions:
-                next_state = transitions[(current_state, symbol)]
-                steps.append(f"Read '{symbol}', move from {current_state} to {next_state}")
-                current_state = next_state
+    def definition(self):
+        # Everything the compiled table depends on; TableCache keys files by its hash.
+        return ('FA', sorted(self.Vn), sorted(self.Vt), self.P, self.S)
+
+    def build(self):
+        states, transitions, accepting_states, start_state = self.convert_grammar_to_fa()
+        return CompiledFA(states, transitions, accepting_states, start_state, self.Vt)
+
+    def compile(self, cache=None):
+        """The dense table, built once; every later check reuses it.
+
+        With a TableCache, a table compiled by an earlier run from the same
+        definition is mapped in from disk instead of being rebuilt.
+        """
+        if self.compiled is None:
+            if cache is None:
+                self.compiled = self.build()
             else:
-                steps.append(f"Read '{symbol}', no transition exists. String rejected.")
-                return steps
+                self.compiled = cache.get(self.definition(), CompiledFA, self.build)
+        return self.compiled
 
-        if current_state in accepting_states:
-            steps.append(f"String accepted: Ended in accepting state {current_state}.")
-        else:
-            steps.append(f"String rejected: Ended in non-accepting state {current_state}.")
+    def accepts(self, string):
+        return self.compile().accepts(string)
 
-        return steps
+    def accepts_many(self, strings):
+        return self.compile().accepts_many(strings)
+
+    def check_string_via_transition(self, string):
+        return self.compile().trace(string)
 
 
 if __name__ == "__main__":
@@ -168,7 +223,7 @@ if __name__ == "__main__":
     five_strings = grammar.generate_5_strings()
     print("\n5 Unique Strings:", five_strings)
 
-    result1 = grammar.check_string('bdb')
+    result1 = grammar.check_string('bdb', trace=True)
     print("\nChecking if the string bdb was obtained via the finite set of production of rules from the Grammar:")
     print(result1)
 
@@ -0,0 +1,45 @@
+from array import array
+
+# The table code is shared with lab2, in the common package at the repository
+# root; the lab's entry points put that on sys.path.
+from common.table import DenseTable
+
+class CompiledFA(DenseTable):
+    """Dense transition table for the automaton built by FA.convert_grammar_to_fa().
+
+    See DenseTable for the layout; stepping is a single index per character.
+    """
+
+    def __init__(self, states, transitions, accepting_states, start_state, alphabet=()):
+        self.states = sorted(states)
+        self.state_ids = {state: index for index, state in enumerate(self.states)}
+        self.symbols = sorted(set(alphabet) | {symbol for _, symbol in transitions})
+        self.symbol_ids = {symbol: index for index, symbol in enumerate(self.symbols)}
+        self.width = max(1, len(self.symbols))
+        self.table = array('i', [-1]) * (len(self.states) * self.width)
+        for (state, symbol), target in transitions.items():
+            row = self.state_ids[state] * self.width
+            self.table[row + self.symbol_ids[symbol]] = self.state_ids[target] * self.width
+        self.accepting = array('B', [state in accepting_states for state in self.states])
+        self.start = self.state_ids[start_state] * self.width
+        self.padded = None
+
+    def trace(self, string):
+        """Runs `string` while logging every step, as FA.check_string_via_transition() does."""
+        name = lambda row: self.states[row // self.width]
+        row = self.start
+        steps = [f"Start at {name(row)}"]
+        for symbol in string:
+            column = self.symbol_ids.get(symbol)
+            target = -1 if column is None else self.table[row + column]
+            if target < 0:
+                steps.append(f"Read '{symbol}', no transition exists. String rejected.")
+                return steps
+            steps.append(f"Read '{symbol}', move from {name(row)} to {name(target)}")
+            row = target
+
+        if self.accepting[row // self.width]:
+            steps.append(f"String accepted: Ended in accepting state {name(row)}.")
+        else:
+            steps.append(f"String rejected: Ended in non-accepting state {name(row)}.")
+        return steps
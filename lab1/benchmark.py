@@ -0,0 +1,273 @@
+import os
+import random
+import sys
+import tempfile
+import time
+
+# The LAB modules import the common package from the repository root.
+sys.path.insert(1, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from LAB_1 import Grammar, FA
+from common.cache import TableCache
+
+VN = ["S", "A", "B"]
+VT = ["a", "b", "c", "d"]
+P = "S->bS|dA, A->aA|dB|b, B->cB|a"
+
+
+class LegacyGrammar(Grammar):
+    """The original reverse-derivation search and string generation, kept for comparison."""
+
+    def generate_string(self):
+        string = self.S
+        steps = []
+
+        while any(char in self.Vn for char in string):
+            new_string = ""
+            for char in string:
+                if char in self.P_dictionary:
+                    new_string += random.choice(self.P_dictionary[char])
+                else:
+                    new_string += char
+            steps.append(f"{string} -> {new_string}")
+            string = new_string
+
+        return string, steps
+
+    def check_string(self, string):
+        reversed_P_dictionary = self.reverse_dictionary()
+        current_strings = [list(string)]
+        transitions = []
+
+        while current_strings:
+            new_strings = []
+            for s in current_strings:
+                if "".join(s) == self.S:
+                    transitions.append(f"Valid derivation: {self.S} -> {''.join(string)}")
+                    return transitions
+
+                for i in range(len(s)):
+                    substring = "".join(s[i:i + 2])
+                    if substring in reversed_P_dictionary:
+                        for replacement in reversed_P_dictionary[substring]:
+                            new_string = s[:i] + [replacement] + s[i + 2:]
+                            new_strings.append(new_string)
+                            transitions.append(f"{''.join(s)} <- {''.join(new_string)}")
+
+                    elif s[i] in reversed_P_dictionary:
+                        for replacement in reversed_P_dictionary[s[i]]:
+                            new_string = s[:i] + [replacement] + s[i + 1:]
+                            new_strings.append(new_string)
+                            transitions.append(f"{''.join(s)} <- {''.join(new_string)}")
+
+            current_strings = new_strings
+
+        return ["No valid derivation found."]
+
+
+class LegacyFA(FA):
+    """The original per-call conversion and dict walk, kept for comparison."""
+
+    def check_string_via_transition(self, string):
+        states, transitions, accepting_states, current_state = self.convert_grammar_to_fa()
+        steps = [f"Start at {current_state}"]
+
+        for symbol in string:
+            if (current_state, symbol) in transitions:
+                next_state = transitions[(current_state, symbol)]
+                steps.append(f"Read '{symbol}', move from {current_state} to {next_state}")
+                current_state = next_state
+            else:
+                steps.append(f"Read '{symbol}', no transition exists. String rejected.")
+                return steps
+
+        if current_state in accepting_states:
+            steps.append(f"String accepted: Ended in accepting state {current_state}.")
+        else:
+            steps.append(f"String rejected: Ended in non-accepting state {current_state}.")
+
+        return steps
+
+
+def measure(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def accepted_string(length):
+    """b...bdaab...: S loops on b, then d moves to A, which loops on a and ends with b."""
+    half = (length - 2) // 2
+    return "b" * half + "d" + "a" * (length - 2 - half) + "b"
+
+
+def bench_membership(lengths=(10, 100, 1000, 10000), legacy_limit=10):
+    grammar = Grammar(VN, VT, P, "S")
+    legacy = LegacyGrammar(VN, VT, P, "S")
+    for length in lengths:
+        string = accepted_string(length)
+        rejected = string[:-1] + "c"
+        print(f"strings of length {length:,}")
+        result, elapsed = measure(lambda: grammar.check_string(string))
+        assert grammar.accepts(string) and not grammar.accepts(rejected)
+        print(f"  earley:               {elapsed * 1000:10.2f} ms")
+        steps, elapsed = measure(lambda: grammar.check_string(string, trace=True))
+        print(f"  earley + derivation:  {elapsed * 1000:10.2f} ms ({len(steps) - 1} steps)")
+        if length <= legacy_limit:
+            legacy_result, elapsed = measure(lambda: legacy.check_string(string))
+            assert legacy_result[-1] == result[-1]
+            print(f"  reverse BFS (before): {elapsed * 1000:10.2f} ms")
+
+
+def random_strings(count, length=12, seed=0):
+    """Strings over VT that mostly follow the automaton, so runs are not cut short at once."""
+    rng = random.Random(seed)
+    pieces = ["b", "b", "da", "a", "dc", "c", "db", "a"]
+    return ["".join(rng.choice(pieces) for _ in range(length // 2)) for _ in range(count)]
+
+
+def bench_fa(count=10 ** 6):
+    fa = FA(VN, VT, P, "S")
+    legacy = LegacyFA(VN, VT, P, "S")
+    strings = random_strings(count)
+    print(f"checking {count:,} strings against the FA")
+    accepted, elapsed = measure(lambda: [fa.accepts(string) for string in strings])
+    print(f"  compiled table accepts(): {count / elapsed:12,.0f} strings/sec ({sum(accepted):,} accepted)")
+    sample = strings[:count // 10]
+    steps, elapsed = measure(lambda: [fa.check_string_via_transition(string) for string in sample])
+    print(f"  compiled table trace():   {len(sample) / elapsed:12,.0f} strings/sec")
+    legacy_steps, elapsed = measure(lambda: [legacy.check_string_via_transition(string) for string in sample])
+    print(f"  rebuild + dict (before):  {len(sample) / elapsed:12,.0f} strings/sec")
+    assert steps == legacy_steps
+    assert accepted[:len(sample)] == [trace[-1].startswith("String accepted") for trace in legacy_steps]
+
+
+def path_strings(count, seed=0):
+    """Strings that follow the FA to the end (b*da*b or b*da*dc*a), a tenth with one typo."""
+    rng = random.Random(seed)
+    strings = []
+    for _ in range(count):
+        string = "b" * rng.randrange(10) + "d" + "a" * rng.randrange(10)
+        string += "b" if rng.random() < 0.5 else "d" + "c" * rng.randrange(10) + "a"
+        if rng.random() < 0.1:
+            typo = rng.randrange(len(string))
+            string = string[:typo] + rng.choice(VT) + string[typo + 1:]
+        strings.append(string)
+    return strings
+
+
+def bench_accepts_many(count=10 ** 6):
+    fa = FA(VN, VT, P, "S")
+    for label, strings in (("random", random_strings(count)), ("near-accepted", path_strings(count))):
+        print(f"checking {count:,} {label} strings against the FA")
+        expected, elapsed = measure(lambda: [fa.accepts(string) for string in strings])
+        print(f"  python loop over accepts(): {count / elapsed:12,.0f} strings/sec")
+        accepted, elapsed = measure(lambda: fa.accepts_many(strings))
+        print(f"  numpy accepts_many():       {count / elapsed:12,.0f} strings/sec")
+        assert accepted.tolist() == expected
+
+
+def chain_grammar(size):
+    """A right-linear grammar with `size` nonterminals, N0 -a-> N1 -a-> ... -a-> N0, c resets.
+
+    convert_grammar_to_fa() wants one-character nonterminals, so they are
+    code points from U+0100 upwards, stepping over the surrogates.
+    """
+    vn = [chr(0x100 + i + (0x800 if 0x100 + i >= 0xD800 else 0)) for i in range(size)]
+    rules = [f"{vn[i]}->a{vn[(i + 1) % size]}|c{vn[0]}|b" for i in range(size)]
+    return vn, ["a", "b", "c"], ", ".join(rules), vn[0]
+
+
+def bench_cache(sizes=(10 ** 4, 10 ** 5)):
+    with tempfile.TemporaryDirectory() as directory:
+        cache = TableCache(directory)
+        for size in sizes:
+            definition = chain_grammar(size)
+            print(f"compiling an FA with {size:,} states")
+            _, elapsed = measure(lambda: FA(*definition).compile())
+            print(f"  no cache:       {elapsed * 1000:10.1f} ms")
+            _, elapsed = measure(lambda: FA(*definition).compile(cache))
+            print(f"  cold cache:     {elapsed * 1000:10.1f} ms (build + write)")
+            fa = FA(*definition)
+            compiled, elapsed = measure(lambda: fa.compile(cache))
+            print(f"  warm cache:     {elapsed * 1000:10.1f} ms (mmap)")
+            string = "a" * (size - 1)
+            assert fa.accepts(string) and not fa.accepts(string + "b")
+
+
+def bench_store(sizes=(10, 1000, 10 ** 4), count=10 ** 4):
+    for size in sizes:
+        definition = chain_grammar(size)
+        print(f"generating {count:,} strings from a grammar with {size:,} nonterminals")
+        grammar, elapsed = measure(lambda: Grammar(*definition))
+        print(f"  parse into the store:  {elapsed * 1000:10.1f} ms")
+        random.seed(0)
+        strings, elapsed = measure(lambda: [grammar.generate_string() for _ in range(count)])
+        print(f"  interned ids, flags:   {count / elapsed:10,.0f} strings/sec")
+        legacy = LegacyGrammar(*definition)
+        random.seed(0)
+        legacy_strings, elapsed = measure(lambda: [legacy.generate_string() for _ in range(count)])
+        print(f"  Vn list scan (before): {count / elapsed:10,.0f} strings/sec")
+        assert strings == legacy_strings
+
+
+def bench_enumerate(count=10 ** 5, longest=500):
+    grammar = Grammar(VN, VT, P, "S")
+    language = grammar.get_language()
+    counts, elapsed = measure(lambda: grammar.count_strings(longest))
+    print(f"counting strings of every length up to {longest}: {elapsed * 1000:.1f} ms, "
+          f"{sum(counts):.3e} strings in total")
+    words, elapsed = measure(lambda: language.first(count))
+    print(f"  first {count:,} in shortlex order: {count / elapsed:10,.0f} strings/sec (up to length {len(words[-1])})")
+    assert words == sorted(words, key=lambda word: (len(word), word)) and len(set(words)) == count
+    sample = count // 1000
+    random.seed(0)
+    legacy = LegacyGrammar(VN, VT, P, "S")
+    draws = 0
+    unique = set()
+    start = time.perf_counter()
+    while len(unique) < sample:
+        unique.add(legacy.generate_string()[0])
+        draws += 1
+    elapsed = time.perf_counter() - start
+    print(f"  {sample:,} unique by random draws (before): {sample / elapsed:10,.0f} strings/sec, {draws:,} draws")
+
+
+def bench_sample(length=20, count=10 ** 6):
+    grammar = Grammar(VN, VT, P, "S")
+    sampler, elapsed = measure(lambda: grammar.sampler(length, seed=0))
+    print(f"{sampler.total:,} strings of length {length}; counting table built in {elapsed * 1000:.1f} ms")
+    words, elapsed = measure(lambda: sampler.batch(count))
+    print(f"  numpy batch():                 {count / elapsed:12,.0f} strings/sec")
+    assert all(len(word) == length and grammar.accepts(word) for word in words[:1000])
+    sample = count // 10
+    _, elapsed = measure(lambda: sampler.samples(sample))
+    print(f"  samples():                     {sample / elapsed:12,.0f} strings/sec")
+    random.seed(0)
+    _, elapsed = measure(lambda: [grammar.random_string() for _ in range(sample)])
+    print(f"  random_string(), any length:   {sample / elapsed:12,.0f} strings/sec")
+    tries = 0
+    start = time.perf_counter()
+    for _ in range(100):
+        while True:
+            tries += 1
+            if len(grammar.random_string()) == length:
+                break
+    elapsed = time.perf_counter() - start
+    print(f"  retry until length {length} (before): {100 / elapsed:12,.0f} strings/sec, "
+          f"{tries / 100:.0f} tries each")
+
+
+BENCHMARKS = {
+    'membership': bench_membership,
+    'fa': bench_fa,
+    'accepts_many': bench_accepts_many,
+    'cache': bench_cache,
+    'store': bench_store,
+    'enumerate': bench_enumerate,
+    'sample': bench_sample,
+}
+
+if __name__ == "__main__":
+    for name in sys.argv[1:] or BENCHMARKS:
+        BENCHMARKS[name]()
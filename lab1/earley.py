@@ -0,0 +1,153 @@
+class EarleyRecognizer:
+    """Earley membership test for a context-free grammar, built once per grammar.
+
+    `productions` maps each nonterminal to its right-hand sides (strings, one
+    character per symbol, "" for an empty rule). Rules are numbered and
+    indexed by left-hand side up front, so every check only walks the chart.
+    Runs in O(n) for the right-linear grammars of this lab, O(n^3) at worst.
+    """
+
+    def __init__(self, productions, start, nonterminals=()):
+        self.start = start
+        self.lhs = []
+        self.rhs = []
+        self.rules_for = {symbol: [] for symbol in nonterminals}
+        for left, rights in productions.items():
+            rules = self.rules_for.setdefault(left, [])
+            for right in rights:
+                rules.append(len(self.lhs))
+                self.lhs.append(left)
+                self.rhs.append(tuple(right))
+        self.nullable_rule = self.find_nullable()
+
+    def find_nullable(self):
+        """Maps each nonterminal that derives "" to a rule that derives it."""
+        nullable_rule = {}
+        changed = True
+        while changed:
+            changed = False
+            for rule, right in enumerate(self.rhs):
+                left = self.lhs[rule]
+                if left not in nullable_rule and all(symbol in nullable_rule for symbol in right):
+                    nullable_rule[left] = rule
+                    changed = True
+        return nullable_rule
+
+    def chart(self, string, back_pointers=False):
+        """Runs the recogniser; returns the item sets, or None once a set is empty.
+
+        Items are (rule, dot, origin) tuples. With `back_pointers`, each set
+        also maps every item to the (set index, child) it was first built from;
+        see derivation().
+        """
+        rules_for = self.rules_for
+        nullable_rule = self.nullable_rule
+        lhs, rhs = self.lhs, self.rhs
+        sets = []
+        items = [(rule, 0, 0) for rule in rules_for.get(self.start, ())]
+        seen = set(items)
+        pointers = {} if back_pointers else None
+
+        def add(item, pointer):
+            if item not in seen:
+                seen.add(item)
+                items.append(item)
+                if back_pointers:
+                    pointers[item] = pointer
+
+        for position in range(len(string) + 1):
+            waiting = {}
+            sets.append((items, seen, waiting, pointers))
+            next_items, next_seen = [], set()
+            next_pointers = {} if back_pointers else None
+            symbol_at = string[position] if position < len(string) else None
+            index = 0
+            while index < len(items):
+                item = items[index]
+                index += 1
+                rule, dot, origin = item
+                right = rhs[rule]
+                if dot == len(right):
+                    for rule_w, dot_w, origin_w in sets[origin][2].get(lhs[rule], ()):
+                        add((rule_w, dot_w + 1, origin_w), (origin, (item, position)))
+                    continue
+                symbol = right[dot]
+                if symbol not in rules_for:
+                    if symbol == symbol_at:
+                        advanced = (rule, dot + 1, origin)
+                        if advanced not in next_seen:
+                            next_seen.add(advanced)
+                            next_items.append(advanced)
+                            if back_pointers:
+                                next_pointers[advanced] = (position, symbol)
+                    continue
+                if symbol in waiting:
+                    waiting[symbol].append(item)
+                else:
+                    waiting[symbol] = [item]
+                    for predicted in rules_for[symbol]:
+                        add((predicted, 0, position), None)
+                if symbol in nullable_rule:
+                    # Completions of an empty match happen in this same set, possibly
+                    # before this item arrived, so step over the symbol directly.
+                    add((rule, dot + 1, origin), (position, symbol))
+            if position == len(string):
+                return sets
+            if not next_items:
+                return None
+            items, seen, pointers = next_items, next_seen, next_pointers
+
+    def accepting_item(self, sets, length):
+        if sets is None:
+            return None
+        seen = sets[length][1]
+        for rule in self.rules_for.get(self.start, ()):
+            item = (rule, len(self.rhs[rule]), 0)
+            if item in seen:
+                return item
+        return None
+
+    def accepts(self, string):
+        return self.accepting_item(self.chart(string), len(string)) is not None
+
+    def children(self, sets, item, end):
+        """The child nodes of a completed item, left to right, read off the back pointers."""
+        rule, dot, origin = item
+        result = []
+        while dot:
+            position, child = sets[end][3][(rule, dot, origin)]
+            result.append(child)
+            dot -= 1
+            end = position
+        result.reverse()
+        return result
+
+    def derivation(self, string):
+        """A leftmost derivation of `string` as "form -> next form" steps, or None."""
+        sets = self.chart(string, back_pointers=True)
+        root = self.accepting_item(sets, len(string))
+        if root is None:
+            return None
+        # A pending node is a terminal, a nonterminal deriving "" (both plain
+        # symbols), or a completed (item, end position) pair.
+        prefix = []
+        pending = [(root, len(string))]
+        steps = []
+        while pending:
+            node = pending.pop()
+            if isinstance(node, str) and node not in self.rules_for:
+                prefix.append(node)
+                continue
+            if isinstance(node, str):
+                children = list(self.rhs[self.nullable_rule[node]])
+            else:
+                children = self.children(sets, *node)
+            done = "".join(prefix)
+            rest = "".join(self.symbol(child) for child in reversed(pending))
+            expansion = "".join(self.symbol(child) for child in children)
+            steps.append(f"{done}{self.symbol(node)}{rest} -> {done}{expansion}{rest}")
+            pending.extend(reversed(children))
+        return steps
+
+    def symbol(self, node):
+        return node if isinstance(node, str) else self.lhs[node[0][0]]
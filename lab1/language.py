@@ -0,0 +1,153 @@
+from itertools import islice
+
+# The NFA state reached after a production's last terminal (A -> a).
+FINAL = -1
+
+class Language:
+    """Counts and lists the words of a right-linear grammar held in a GrammarStore.
+
+    The grammar is read as an NFA (A -> aB moves from A to B on a, A -> a
+    moves to FINAL, A -> ε makes A final). NFA states that cannot reach a
+    final state are dropped up front, and the NFA is determinised lazily:
+    each DFA state is the frozenset of live NFA states a word leads to, so
+    every word reaches exactly one DFA state (no duplicates) and every
+    non-empty DFA state can still be completed into a word.
+    """
+
+    def __init__(self, store):
+        moves = {}
+        final = {FINAL}
+        for lhs, rhs_list in store.productions.items():
+            for rhs in rhs_list:
+                if not rhs:
+                    final.add(lhs)
+                elif store.is_nonterminal(rhs[0]) or len(rhs) > 2 or len(rhs) == 2 and not store.is_nonterminal(rhs[1]):
+                    raise ValueError(f"{store.symbols[lhs]} -> {store.text(rhs)} is not right-linear")
+                else:
+                    target = rhs[1] if len(rhs) == 2 else FINAL
+                    moves.setdefault(lhs, {}).setdefault(store.symbols[rhs[0]], set()).add(target)
+
+        # Live states: those with a path to a final state.
+        predecessors = {}
+        for state, trans in moves.items():
+            for targets in trans.values():
+                for target in targets:
+                    predecessors.setdefault(target, set()).add(state)
+        live = set(final)
+        stack = list(final)
+        while stack:
+            for state in predecessors.get(stack.pop(), ()):
+                if state not in live:
+                    live.add(state)
+                    stack.append(state)
+
+        self.moves = {state: {symbol: targets & live for symbol, targets in trans.items()}
+                      for state, trans in moves.items() if state in live}
+        self.final_states = final
+        self.symbols = sorted({symbol for trans in self.moves.values() for symbol in trans})
+        self.ids = {}
+        self.subsets = []
+        self.final = []
+        self.rows = []
+        start = frozenset({store.start} & live)
+        self.start = self.state(start) if start else None
+        # layers[n] holds the DFA states that words of length n lead to.
+        self.layers = [] if self.start is None else [{self.start}]
+
+    def state(self, subset):
+        index = self.ids.get(subset)
+        if index is None:
+            index = self.ids[subset] = len(self.subsets)
+            self.subsets.append(subset)
+            self.final.append(not subset.isdisjoint(self.final_states))
+            self.rows.append(None)
+        return index
+
+    def row(self, state):
+        """(symbol, target) pairs out of a DFA state, in symbol order, built on first use."""
+        row = self.rows[state]
+        if row is None:
+            row = []
+            subset = self.subsets[state]
+            for symbol in self.symbols:
+                target = set()
+                for member in subset:
+                    target |= self.moves.get(member, {}).get(symbol, set())
+                if target:
+                    row.append((symbol, self.state(frozenset(target))))
+            self.rows[state] = row
+        return row
+
+    def layer(self, length):
+        """The DFA states reached by words of exactly `length` symbols."""
+        layers = self.layers
+        while len(layers) <= length and layers and layers[-1]:
+            layers.append({target for state in layers[-1] for _, target in self.row(state)})
+        return layers[length] if length < len(layers) else set()
+
+    def counts(self, longest):
+        """counts[n] is the number of words of length n, for n up to `longest`.
+
+        Words are counted per DFA state, layer by layer, never listed.
+        """
+        counts = []
+        ways = {} if self.start is None else {self.start: 1}
+        for _ in range(longest + 1):
+            counts.append(sum(number for state, number in ways.items() if self.final[state]))
+            following = {}
+            for state, number in ways.items():
+                for _, target in self.row(state):
+                    following[target] = following.get(target, 0) + number
+            ways = following
+        return counts
+
+    def count(self, length):
+        return self.counts(length)[length]
+
+    def words_of_length(self, length):
+        """Yields the words of exactly `length` symbols, in lexicographic order."""
+        if not self.layer(length):
+            return
+        # good[d]: states at depth d from which some word completes at `length`.
+        good = [None] * (length + 1)
+        good[length] = {state for state in self.layers[length] if self.final[state]}
+        for depth in range(length - 1, -1, -1):
+            good[depth] = {state for state in self.layers[depth]
+                           if any(target in good[depth + 1] for _, target in self.row(state))}
+        if self.start not in good[0]:
+            return
+        if length == 0:
+            yield ""
+            return
+        # Depth-first, symbols in order; pruning keeps every branch productive.
+        word = []
+        stack = [iter(self.row(self.start))]
+        while stack:
+            for symbol, target in stack[-1]:
+                if target in good[len(stack)]:
+                    word.append(symbol)
+                    if len(stack) == length:
+                        yield "".join(word)
+                        word.pop()
+                    else:
+                        stack.append(iter(self.row(target)))
+                    break
+            else:
+                stack.pop()
+                if word:
+                    word.pop()
+
+    def words(self, longest=None):
+        """Yields every word in shortlex order (by length, then alphabetically).
+
+        Stops after `longest` symbols, or, if that is None, once no longer
+        word exists; for an infinite language the stream never ends.
+        """
+        length = 0
+        while (longest is None or length <= longest) and self.layer(length):
+            yield from self.words_of_length(length)
+            length += 1
+
+    def first(self, count):
+        """The first `count` words in shortlex order (fewer if the language is smaller)."""
+        return list(islice(self.words(), count))
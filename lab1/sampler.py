@@ -0,0 +1,126 @@
+import random
+from bisect import bisect_right
+
+try:
+    import numpy as np
+except ImportError:  # only batch() needs numpy
+    np = None
+
+INT64_MAX = (1 << 63) - 1
+
+class UniformSampler:
+    """Draws words of one length uniformly at random from a Language.
+
+    For every depth d and DFA state s reachable there, the number of ways
+    to finish a word from s in the remaining length - d symbols is counted
+    once, backwards. A draw then walks from the start state and picks each
+    outgoing symbol with probability proportional to the count behind it,
+    which makes every word of the length exactly equally likely, with no
+    rejection. Counting DFA paths rather than derivations keeps this exact
+    for ambiguous grammars too.
+    """
+
+    def __init__(self, language, length, seed=None):
+        self.length = length
+        self.rng = random.Random(seed)
+        self.seed = seed
+        # remaining[d][s]: number of completions of length - d symbols from s.
+        remaining = [{} for _ in range(length + 1)]
+        if language.layer(length):
+            remaining[length] = {state: 1 for state in language.layers[length] if language.final[state]}
+            for depth in range(length - 1, -1, -1):
+                after = remaining[depth + 1]
+                for state in language.layers[depth]:
+                    total = sum(after.get(target, 0) for _, target in language.row(state))
+                    if total:
+                        remaining[depth][state] = total
+        self.start = language.start
+        # The number of words of this length (an int of any size).
+        self.total = remaining[0].get(self.start, 0)
+        # choices[d][s] = (cumulative counts, symbols, targets) over the useful edges.
+        self.choices = []
+        for depth in range(length if self.total else 0):
+            after = remaining[depth + 1]
+            level = {}
+            for state in remaining[depth]:
+                cumulative, symbols, targets = [], [], []
+                running = 0
+                for symbol, target in language.row(state):
+                    if target in after:
+                        running += after[target]
+                        cumulative.append(running)
+                        symbols.append(symbol)
+                        targets.append(target)
+                level[state] = (cumulative, symbols, targets)
+            self.choices.append(level)
+        self.tables = None
+        self.generator = None
+
+    def sample(self):
+        if not self.total:
+            raise ValueError(f"there are no words of length {self.length}")
+        randrange = self.rng.randrange
+        state = self.start
+        word = []
+        for level in self.choices:
+            cumulative, symbols, targets = level[state]
+            index = bisect_right(cumulative, randrange(cumulative[-1]))
+            word.append(symbols[index])
+            state = targets[index]
+        return "".join(word)
+
+    def samples(self, count):
+        return [self.sample() for _ in range(count)]
+
+    def batch(self, count):
+        """`count` uniform words drawn together with NumPy.
+
+        Needs every count to fit in an int64; for longer words (or without
+        numpy, which raises ImportError) use samples().
+        """
+        if np is None:
+            raise ImportError("batch() requires numpy")
+        if not self.total:
+            raise ValueError(f"there are no words of length {self.length}")
+        if self.total > INT64_MAX:
+            raise OverflowError("word counts exceed int64; use samples()")
+        if self.tables is None:
+            self.tables = self.numpy_tables()
+            self.generator = np.random.default_rng(self.seed)
+        local = np.zeros(count, dtype=np.intp)
+        points = np.empty((count, self.length), dtype=np.uint32)
+        for depth, (cumulative, codes, targets) in enumerate(self.tables):
+            bounds = cumulative[local]
+            picks = self.generator.integers(0, bounds[:, -1])
+            index = (picks[:, None] >= bounds).sum(axis=1)
+            points[:, depth] = codes[local, index]
+            local = targets[local, index]
+        text = points.tobytes().decode('utf-32-le')
+        length = self.length
+        return [text[start:start + length] for start in range(0, len(text), length)] if length else [""] * count
+
+    def numpy_tables(self):
+        """Per depth: (cumulative counts, code points, next local state), one padded row per state.
+
+        Rows are padded with the row total so padding is never picked.
+        """
+        tables = []
+        states = [self.start]
+        for level in self.choices:
+            following = {}
+            for state in states:
+                for target in level[state][2]:
+                    following.setdefault(target, len(following))
+            width = max(len(level[state][0]) for state in states)
+            cumulative = np.zeros((len(states), width), dtype=np.int64)
+            codes = np.zeros((len(states), width), dtype=np.uint32)
+            targets = np.zeros((len(states), width), dtype=np.intp)
+            for row, state in enumerate(states):
+                counts, symbols, next_states = level[state]
+                cumulative[row, :len(counts)] = counts
+                cumulative[row, len(counts):] = counts[-1]
+                codes[row, :len(symbols)] = [ord(symbol) for symbol in symbols]
+                targets[row, :len(next_states)] = [following[target] for target in next_states]
+            tables.append((cumulative, codes, targets))
+            states = list(following)
+        return tables
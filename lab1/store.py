@@ -0,0 +1,82 @@
+EPSILON = 'ε'
+
+class GrammarStore:
+    """An interned grammar: every symbol is an integer id.
+
+    `symbols[id]` is a symbol's name and `ids[name]` its id. Nonterminals
+    are flagged in the `nonterminal` bytearray (one byte per id), so
+    membership is one index instead of a list scan. `productions[id]`
+    lists the right-hand sides of a nonterminal as tuples of ids (the empty
+    tuple is ε), and `reverse[rhs]` lists the nonterminals producing `rhs`.
+    """
+
+    def __init__(self, nonterminals, terminals, start):
+        self.symbols = []
+        self.ids = {}
+        self.nonterminal = bytearray()
+        for symbol in nonterminals:
+            self.nonterminal[self.intern(symbol)] = 1
+        for symbol in terminals:
+            self.intern(symbol)
+        self.start = self.intern(start)
+        self.nonterminal[self.start] = 1
+        self.productions = {}
+        self.reverse = {}
+
+    @classmethod
+    def parse(cls, Vn, Vt, P, S):
+        """Reads the "S->bS|dA, A->aA|b" notation, one character per symbol."""
+        store = cls(Vn, Vt, S)
+        for pair in P.split(", "):
+            left, right = pair.split("->")
+            for rule in right.split("|"):
+                store.add(left, "" if rule == EPSILON else rule)
+        return store
+
+    @classmethod
+    def from_productions(cls, variables, terminals, start, productions):
+        """Builds a store from a {lhs: [rhs, ...]} dict; each rhs is a string or a sequence of symbols."""
+        store = cls(variables, terminals, start)
+        for lhs, rhs_list in productions.items():
+            for rhs in rhs_list:
+                store.add(lhs, rhs)
+        return store
+
+    def intern(self, symbol):
+        index = self.ids.get(symbol)
+        if index is None:
+            index = self.ids[symbol] = len(self.symbols)
+            self.symbols.append(symbol)
+            self.nonterminal.append(0)
+        return index
+
+    def add(self, lhs, rhs):
+        """Adds lhs -> rhs; symbols not seen before are interned as terminals."""
+        left = self.intern(lhs)
+        self.nonterminal[left] = 1
+        right = tuple(self.intern(symbol) for symbol in rhs)
+        self.productions.setdefault(left, []).append(right)
+        self.reverse.setdefault(right, []).append(left)
+
+    def is_nonterminal(self, symbol):
+        return self.nonterminal[symbol] == 1
+
+    def nonterminals(self):
+        return [symbol for index, symbol in enumerate(self.symbols) if self.is_nonterminal(index)]
+
+    def terminals(self):
+        return [symbol for index, symbol in enumerate(self.symbols) if not self.is_nonterminal(index)]
+
+    def text(self, rhs):
+        """The string form of a right-hand side of ids."""
+        return "".join(self.symbols[symbol] for symbol in rhs)
+
+    def rules(self):
+        """The {lhs: [rhs string, ...]} dictionary, as Grammar.P_dictionary holds it."""
+        return {self.symbols[lhs]: [self.text(rhs) for rhs in rhs_list]
+                for lhs, rhs_list in self.productions.items()}
+
+    def notation(self):
+        """The productions in the "S->bS|dA, A->aA|b" notation parse() reads."""
+        return ", ".join(f"{lhs}->" + "|".join(rhs or EPSILON for rhs in rhs_list)
+                         for lhs, rhs_list in self.rules().items())
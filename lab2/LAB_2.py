@@ -1,6 +1,18 @@
-import networkx as nx
-import matplotlib.pyplot as plt
-from collections import defaultdict
+import os
+import sys
+from array import array
+from collections import defaultdict, deque
+
+if __name__ == "__main__":
+    # Run as a script from its own directory: make the repository's common package importable.
+    sys.path.insert(1, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dense import DenseDFA
+from lazy import LazyDFA
+from minimize import hopcroft
+from product import Product, RuleSet
+from scan import ByteScanner
+from subsets import SubsetStepper
 
 class FiniteAutomaton:
     def __init__(self, states, alphabet, transitions, start_state, final_states):
@@ -9,6 +21,8 @@ class FiniteAutomaton:
         self.transitions = transitions  
         self.start_state = start_state
         self.final_states = final_states
+        self.dense = None
+        self.scanner = None
     
     def is_deterministic(self):
         for state, trans in self.transitions.items():
@@ -17,37 +31,234 @@ class FiniteAutomaton:
                     return False
         return True
     
-    def to_dfa(self):
+    def definition(self):
+        # Everything the compiled table depends on; TableCache keys files by its hash.
+        transitions = sorted((state, sorted((symbol, sorted(targets)) for symbol, targets in trans.items()))
+                             for state, trans in self.transitions.items())
+        return ('FiniteAutomaton', sorted(self.states), sorted(self.alphabet), transitions,
+                self.start_state, sorted(self.final_states))
+
+    def to_dfa(self, cache=None):
+        """Subset construction over the subsets reachable from the start state.
+
+        Every DFA state is named after its subset ("q1,q2") and, like the input,
+        maps each symbol to a list of targets. Symbols that lead to the empty
+        subset get no transition. With a TableCache, the DFA is rebuilt from
+        the dense table a previous run stored for the same definition.
+        """
         if self.is_deterministic():
-            return self 
-        
-        new_states = {}
-        queue = [frozenset([self.start_state])]
+            return self
+        if cache is not None:
+            return FiniteAutomaton.from_dense(self.compile(cache), self.alphabet)
+
+        stepper = SubsetStepper(self.states, self.alphabet, self.transitions, self.final_states)
+        start = stepper.bit(self.start_state)
+        # Subsets are interned by their bitset, so each one is named and
+        # expanded exactly once.
+        names = {start: stepper.name(start)}
+        queue = deque([start])
         new_transitions = {}
         new_final_states = set()
-        
+
         while queue:
-            current = queue.pop(0)
-            state_name = ','.join(sorted(current))
-            new_states[current] = state_name
-            new_transitions[state_name] = {}
-            
-            for symbol in self.alphabet:
-                next_states = set()
-                for state in current:
-                    next_states.update(self.transitions.get(state, {}).get(symbol, []))
-                
-                if next_states:
-                    next_state_name = ','.join(sorted(next_states))
-                    new_transitions[state_name][symbol] = next_state_name
-                    if frozenset(next_states) not in new_states:
-                        queue.append(frozenset(next_states))
-                
-                if any(s in self.final_states for s in next_states):
-                    new_final_states.add(next_state_name)
-        
-        return FiniteAutomaton(set(new_states.values()), self.alphabet, new_transitions, new_states[frozenset([self.start_state])], new_final_states)
+            current = queue.popleft()
+            state_name = names[current]
+            trans = new_transitions[state_name] = {}
+            if stepper.is_final(current):
+                new_final_states.add(state_name)
+
+            for symbol in stepper.symbols:
+                target = stepper.step(current, symbol)
+                if not target:
+                    continue
+                if target not in names:
+                    names[target] = stepper.name(target)
+                    queue.append(target)
+                trans[symbol] = [names[target]]
+
+        return FiniteAutomaton(set(names.values()), self.alphabet, new_transitions, names[start], new_final_states)
+
+    @classmethod
+    def from_dense(cls, dense, alphabet):
+        """The FiniteAutomaton a DenseDFA was packed from."""
+        width = dense.width
+        transitions = {}
+        for index, state in enumerate(dense.states):
+            trans = transitions[state] = {}
+            for column, symbol in enumerate(dense.symbols):
+                target = dense.table[index * width + column]
+                if target >= 0:
+                    trans[symbol] = [dense.states[target // width]]
+        final_states = {state for state, final in zip(dense.states, dense.accepting) if final}
+        return cls(set(dense.states), alphabet, transitions, dense.states[dense.start // width], final_states)
+
+    @classmethod
+    def from_store(cls, store):
+        """The NFA of a right-linear grammar held in a GrammarStore (lab1/store.py).
+
+        A -> aB becomes a transition from A to B on a, A -> a one into a new
+        final state "F", and A -> ε makes A final.
+        """
+        final = "F"
+        while final in store.ids:
+            final += "'"
+        transitions = {}
+        final_states = {final}
+        for lhs, rhs_list in store.productions.items():
+            state = store.symbols[lhs]
+            trans = transitions.setdefault(state, {})
+            for rhs in rhs_list:
+                if not rhs:
+                    final_states.add(state)
+                elif store.is_nonterminal(rhs[0]) or len(rhs) > 2 or len(rhs) == 2 and not store.is_nonterminal(rhs[1]):
+                    raise ValueError(f"{state} -> {store.text(rhs)} is not right-linear")
+                else:
+                    target = store.symbols[rhs[1]] if len(rhs) == 2 else final
+                    trans.setdefault(store.symbols[rhs[0]], []).append(target)
+        states = set(store.nonterminals()) | {final}
+        return cls(states, set(store.terminals()), transitions, store.symbols[store.start], final_states)
+
+    def to_lazy_dfa(self, capacity=None):
+        """A DFA that only determinises the subsets the inputs actually reach.
+
+        `capacity` bounds how many of those states stay cached (LRU).
+        """
+        return LazyDFA(self, capacity)
     
+    def minimize(self):
+        """The minimal DFA for this automaton's language, by Hopcroft's algorithm.
+
+        Unreachable states are dropped. Missing transitions lead to an implicit
+        dead state during refinement; states equivalent to it are left out of
+        the result, which stays partial like the input. Each state of the
+        result is named after the first (sorted) state of its class.
+        """
+        dfa = self.to_dfa()
+        ids = {dfa.start_state: 0}
+        order = [dfa.start_state]
+        for state in order:
+            for targets in dfa.transitions.get(state, {}).values():
+                for target in targets:
+                    if target not in ids:
+                        ids[target] = len(order)
+                        order.append(target)
+
+        symbols = sorted(self.alphabet)
+        width = max(1, len(symbols))
+        dead = len(order)
+        table = array('i', [dead]) * ((dead + 1) * width)
+        for state, index in ids.items():
+            for column, symbol in enumerate(symbols):
+                targets = dfa.transitions.get(state, {}).get(symbol)
+                if targets:
+                    table[index * width + column] = ids[targets[0]]
+        accepting = [state in dfa.final_states for state in order] + [False]
+        block_of = hopcroft(dead + 1, width, table, accepting)
+
+        names = {}
+        for state in sorted(order):
+            names.setdefault(block_of[ids[state]], state)
+        start = names[block_of[0]]
+        dead_block = block_of[dead]
+        new_transitions = {}
+        new_final_states = set()
+        for block, name in names.items():
+            if block == dead_block and name != start:
+                continue
+            index = ids[name]
+            trans = new_transitions[name] = {}
+            for column, symbol in enumerate(symbols):
+                target = block_of[table[index * width + column]]
+                if target != dead_block:
+                    trans[symbol] = [names[target]]
+            if accepting[index]:
+                new_final_states.add(name)
+        return FiniteAutomaton(set(new_transitions), self.alphabet, new_transitions, start, new_final_states)
+
+    def product(self, other, accept):
+        """The reachable part of the product automaton of self and other.
+
+        A product state is final when `accept(in_self, in_other)` holds for
+        the finality of its two halves. Each state is named "(p; q)" after
+        the DFA states it pairs, with "-" for a half that has died.
+        """
+        parts = (self.compile(), other.compile())
+        product = Product(parts)
+
+        def name(state):
+            halves = ["-", "-"]
+            for index, row in state:
+                halves[index] = parts[index].states[row // parts[index].width]
+            return "(" + "; ".join(halves) + ")"
+
+        new_transitions = {}
+        new_final_states = set()
+        for state, moves in product.explore():
+            state_name = name(state)
+            new_transitions[state_name] = {symbol: [name(target)] for symbol, target in moves.items()}
+            accepted = product.accepted(state)
+            if accept(0 in accepted, 1 in accepted):
+                new_final_states.add(state_name)
+        return FiniteAutomaton(set(new_transitions), set(self.alphabet) | set(other.alphabet),
+                               new_transitions, name(product.start), new_final_states)
+
+    def intersection(self, other):
+        return self.product(other, lambda left, right: left and right)
+
+    def union(self, other):
+        return self.product(other, lambda left, right: left or right)
+
+    def complement(self, alphabet=None):
+        """A DFA accepting every string over the alphabet that this automaton rejects.
+
+        `alphabet` widens the alphabet the complement is taken over. Missing
+        transitions are sent to a new sink state, named "∅".
+        """
+        dfa = self.to_dfa()
+        symbols = set(self.alphabet) | set(alphabet or ())
+        states = set(dfa.states) | set(dfa.transitions)
+        sink = "∅"
+        while sink in states:
+            sink += "'"
+        new_transitions = {}
+        for state in states | {sink}:
+            trans = dfa.transitions.get(state, {})
+            new_transitions[state] = {symbol: list(trans.get(symbol) or [sink]) for symbol in symbols}
+        new_final_states = states - set(dfa.final_states) | {sink}
+        return FiniteAutomaton(states | {sink}, symbols, new_transitions, dfa.start_state, new_final_states)
+
+    def is_empty(self):
+        """Whether no string is accepted, i.e. no final state is reachable."""
+        seen = {self.start_state}
+        queue = deque([self.start_state])
+        while queue:
+            state = queue.popleft()
+            if state in self.final_states:
+                return False
+            for targets in self.transitions.get(state, {}).values():
+                for target in targets:
+                    if target not in seen:
+                        seen.add(target)
+                        queue.append(target)
+        return True
+
+    def is_equivalent(self, other):
+        """Whether both automata accept the same language.
+
+        Walks the product of their DFAs and stops at the first reachable
+        state where exactly one of them accepts.
+        """
+        product = Product((self.compile(), other.compile()))
+        for state, _ in product.explore():
+            if len(product.accepted(state)) == 1:
+                return False
+        return True
+
+    @staticmethod
+    def fuse(rules):
+        """Fuses a {name: FiniteAutomaton} dict into one RuleSet, checked in a single pass."""
+        return RuleSet(rules)
+
     def to_regular_grammar(self):
         grammar = defaultdict(list)
         for state, trans in self.transitions.items():
@@ -87,7 +298,33 @@ class FiniteAutomaton:
         else:
             return "Type-0 (Unrestricted Grammar)"
     
+    def compile(self, cache=None):
+        """The dense table of the equivalent DFA, built once and reused.
+
+        With a TableCache, a table compiled by an earlier run from the same
+        definition is mapped in from disk instead of being rebuilt.
+        """
+        if self.dense is None:
+            build = lambda: DenseDFA.from_automaton(self.to_dfa())
+            self.dense = build() if cache is None else cache.get(self.definition(), DenseDFA, build)
+        return self.dense
+
+    def accepts(self, string):
+        return self.compile().accepts(string)
+
+    def accepts_many(self, strings):
+        return self.compile().accepts_many(strings)
+
+    def scan_file(self, path, processes=1, count_only=False):
+        """End offsets (or the count) of every match of this language in a file."""
+        if self.scanner is None:
+            self.scanner = ByteScanner(self)
+        return self.scanner.scan_file(path, processes, count_only)
+
     def draw(self):
+        import networkx as nx
+        import matplotlib.pyplot as plt
+
         G = nx.DiGraph()
         for state, trans in self.transitions.items():
             for symbol, targets in trans.items():
@@ -100,22 +337,24 @@ class FiniteAutomaton:
         nx.draw_networkx_edge_labels(G, pos, edge_labels=labels)
         plt.show()
 
-states = {"q0", "q1", "q2", "q3"}
-alphabet = {"a", "b"}
-transitions = {
-    "q0": {"a": ["q1"], "b": ["q0"]},
-    "q1": {"b": ["q1", "q2"]},
-    "q2": {"a": ["q2"], "b": ["q3"]},
-}
-start_state = "q0"
-final_states = {"q3"}
-
-fa = FiniteAutomaton(states, alphabet, transitions, start_state, final_states)
-print("Deterministic?", fa.is_deterministic())
-converted_dfa = fa.to_dfa()
-print("DFA Transitions:", converted_dfa.transitions)
-regular_grammar = fa.to_regular_grammar()
-print("Regular Grammar:", regular_grammar)
-print("Grammar Classification:", fa.classify_grammar(regular_grammar))
-fa.draw()
-x
\ No newline at end of file
+if __name__ == "__main__":
+    states = {"q0", "q1", "q2", "q3"}
+    alphabet = {"a", "b"}
+    transitions = {
+        "q0": {"a": ["q1"], "b": ["q0"]},
+        "q1": {"b": ["q1", "q2"]},
+        "q2": {"a": ["q2"], "b": ["q3"]},
+    }
+    start_state = "q0"
+    final_states = {"q3"}
+
+    fa = FiniteAutomaton(states, alphabet, transitions, start_state, final_states)
+    print("Deterministic?", fa.is_deterministic())
+    converted_dfa = fa.to_dfa()
+    print("DFA Transitions:", converted_dfa.transitions)
+    print("Equivalent to the DFA?", fa.is_equivalent(converted_dfa))
+    print("Intersection with its complement empty?", fa.intersection(fa.complement()).is_empty())
+    regular_grammar = fa.to_regular_grammar()
+    print("Regular Grammar:", regular_grammar)
+    print("Grammar Classification:", fa.classify_grammar(regular_grammar))
+    fa.draw()
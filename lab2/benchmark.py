@@ -0,0 +1,338 @@
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# The LAB modules import the common package from the repository root.
+sys.path.insert(1, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from LAB_2 import FiniteAutomaton
+from common.cache import TableCache
+from scan import ByteScanner
+from subsets import SubsetStepper
+
+STATES = {"q0", "q1", "q2", "q3"}
+ALPHABET = {"a", "b"}
+TRANSITIONS = {
+    "q0": {"a": ["q1"], "b": ["q0"]},
+    "q1": {"b": ["q1", "q2"]},
+    "q2": {"a": ["q2"], "b": ["q3"]},
+}
+
+
+def demo_automaton():
+    return FiniteAutomaton(STATES, ALPHABET, TRANSITIONS, "q0", {"q3"})
+
+
+def legacy_to_dfa(fa):
+    """The original subset construction, kept for comparison."""
+    new_states = {}
+    queue = [frozenset([fa.start_state])]
+    new_transitions = {}
+    new_final_states = set()
+
+    while queue:
+        current = queue.pop(0)
+        state_name = ','.join(sorted(current))
+        new_states[current] = state_name
+        new_transitions[state_name] = {}
+
+        for symbol in fa.alphabet:
+            next_states = set()
+            for state in current:
+                next_states.update(fa.transitions.get(state, {}).get(symbol, []))
+
+            if next_states:
+                next_state_name = ','.join(sorted(next_states))
+                new_transitions[state_name][symbol] = next_state_name
+                if frozenset(next_states) not in new_states:
+                    queue.append(frozenset(next_states))
+
+            if any(s in fa.final_states for s in next_states):
+                new_final_states.add(next_state_name)
+
+    return FiniteAutomaton(set(new_states.values()), fa.alphabet, new_transitions,
+                           new_states[frozenset([fa.start_state])], new_final_states)
+
+
+def nth_from_end(n):
+    """NFA for "the n-th symbol from the end is a": n + 1 states, 2^n DFA states."""
+    states = [f"p{i:03d}" for i in range(n + 1)]
+    transitions = {states[0]: {"a": [states[0], states[1]], "b": [states[0]]}}
+    for i in range(1, n):
+        transitions[states[i]] = {"a": [states[i + 1]], "b": [states[i + 1]]}
+    return FiniteAutomaton(set(states), {"a", "b"}, transitions, states[0], {states[n]})
+
+
+def measure(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def random_strings(count, longest=24, seed=0):
+    rng = random.Random(seed)
+    return ["".join(rng.choices("ab", weights=(1, 3), k=rng.randrange(longest))) for _ in range(count)]
+
+
+def bench_accepts_many(count=10 ** 6):
+    fa = demo_automaton()
+    strings = random_strings(count)
+    print(f"checking {count:,} strings against the DFA")
+    expected, elapsed = measure(lambda: [fa.accepts(string) for string in strings])
+    print(f"  python loop over accepts(): {count / elapsed:12,.0f} strings/sec")
+    accepted, elapsed = measure(lambda: fa.accepts_many(strings))
+    print(f"  numpy accepts_many():       {count / elapsed:12,.0f} strings/sec ({accepted.sum():,} accepted)")
+    assert accepted.tolist() == expected
+
+
+def write_log(path, size, seed=0):
+    """Log-like lines of lowercase words, some of them a/b runs the demo automaton matches."""
+    rng = random.Random(seed)
+    words = ["request", "served", "cache", "miss", "user", "id", "latency", "ok", "ab", "abbab", "bb"]
+    with open(path, 'w') as log:
+        written = 0
+        while written < size:
+            line = "2024-01-01 " + " ".join(rng.choices(words, k=8)) + "\n"
+            log.write(line)
+            written += len(line)
+
+
+def bench_scan(size=32 * 1024 * 1024):
+    scanner = ByteScanner(demo_automaton())
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "access.log")
+        write_log(path, size)
+        megabytes = os.path.getsize(path) / 1e6
+        print(f"scanning a {megabytes:.0f} MB log")
+        plain = ByteScanner(demo_automaton())
+        plain.skip = None
+        expected, elapsed = measure(lambda: plain.scan_file(path))
+        print(f"  byte loop, no skip-ahead:  {megabytes / elapsed:8.1f} MB/sec ({len(expected):,} matches)")
+        for processes in sorted({1, 2, 4, os.cpu_count() or 1}):
+            matches, elapsed = measure(lambda: scanner.scan_file(path, processes))
+            print(f"  skip-ahead, {processes} processes: {megabytes / elapsed:8.1f} MB/sec")
+            assert matches == expected
+        count, elapsed = measure(lambda: scanner.scan_file(path, count_only=True))
+        print(f"  count only:                {megabytes / elapsed:8.1f} MB/sec")
+        assert count == len(expected)
+
+
+def bench_to_dfa(sizes=(8, 12, 14, 16), legacy_limit=14):
+    for n in sizes:
+        fa = nth_from_end(n)
+        print(f"n-th symbol from the end, n = {n}")
+        dfa, elapsed = measure(fa.to_dfa)
+        print(f"  bitset subsets: {elapsed * 1000:10.1f} ms, {len(dfa.states):,} DFA states")
+        if n <= legacy_limit:
+            legacy, elapsed = measure(lambda: legacy_to_dfa(fa))
+            print(f"  before:         {elapsed * 1000:10.1f} ms, {len(legacy.states):,} DFA states")
+            assert legacy.transitions.keys() == dfa.transitions.keys()
+
+
+class LegacySubsetStepper(SubsetStepper):
+    """The original stepper: every 256-entry slice table built up front, the subset shifted a byte at a time."""
+
+    def __init__(self, states, alphabet, transitions, final_states):
+        super().__init__(states, alphabet, transitions, final_states)
+        for symbol in self.symbols:
+            moves = self.moves[symbol]
+            chunks = []
+            for first in range(0, len(self.states), 8):
+                table = [0] * 256
+                for byte in range(1, 256):
+                    low = byte & -byte
+                    index = first + low.bit_length() - 1
+                    targets = moves[index] if index < len(moves) else ()
+                    table[byte] = table[byte ^ low] | sum(1 << target for target in set(targets))
+                chunks.append(table)
+            self.tables[symbol] = chunks
+
+    def step(self, subset, symbol):
+        target = 0
+        for table in self.tables[symbol]:
+            if not subset:
+                break
+            byte = subset & 0xFF
+            if byte:
+                target |= table[byte]
+            subset >>= 8
+        return target
+
+
+def banded_nfa(size, reach=24, seed=0):
+    """A random NFA whose transitions jump at most `reach` states ahead (wrapping
+    around), so the active subset is a band that travels across the whole bitset."""
+    rng = random.Random(seed)
+    states = [f"s{i:05d}" for i in range(size)]
+    ahead = lambda i: states[(i + rng.randrange(1, reach)) % size]
+    transitions = {state: {"a": [ahead(i), ahead(i)], "b": [ahead(i)]} for i, state in enumerate(states)}
+    return FiniteAutomaton(set(states), {"a", "b"}, transitions, states[0], set(states[::7]))
+
+
+def run_subsets(stepper, start, strings):
+    results = []
+    for string in strings:
+        subset = start
+        for symbol in string:
+            subset = stepper.step(subset, symbol)
+        results.append(stepper.is_final(subset))
+    return results
+
+
+def bench_stepper(sizes=(1000, 5000, 20000), count=1000, length=200, legacy_limit=5000):
+    strings = random_strings(count, longest=length, seed=1)
+    for size in sizes:
+        fa = banded_nfa(size)
+        print(f"banded NFA with {size:,} states, {count:,} strings of up to {length} symbols")
+        steppers = [("lazy slice tables", SubsetStepper)]
+        if size <= legacy_limit:
+            steppers.append(("eager tables (before)", LegacySubsetStepper))
+        results = []
+        for label, cls in steppers:
+            tracemalloc.start()
+            stepper, build = measure(lambda: cls(fa.states, fa.alphabet, fa.transitions, fa.final_states))
+            start = stepper.bit(fa.start_state)
+            accepted, elapsed = measure(lambda: run_subsets(stepper, start, strings))
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            filled = sum(entry is not None for tables in stepper.tables.values()
+                         for table in tables if table for entry in table)
+            print(f"  {label + ':':22} build {build * 1000:8.1f} ms, {filled:>9,} table entries, "
+                  f"{peak / 1e6:6.1f} MB peak, {count / elapsed:8,.0f} strings/sec")
+            results.append(accepted)
+        assert all(result == results[0] for result in results)
+
+
+def bench_lazy_dfa(n=40, count=10 ** 5, length=60, capacities=(None, 10 ** 5, 10 ** 4)):
+    fa = nth_from_end(n)
+    strings = random_strings(count, longest=length)
+    expected = [len(s) >= n and s[-n] == "a" for s in strings]
+    print(f"n-th symbol from the end, n = {n}: the full DFA would have 2^{n} states")
+    lazy = fa.to_lazy_dfa()
+    accepted, elapsed = measure(lambda: [lazy.simulate(string) for string in strings])
+    print(f"  bitset NFA simulation:  {count / elapsed:10,.0f} strings/sec")
+    assert accepted == expected
+    for capacity in capacities:
+        lazy = fa.to_lazy_dfa(capacity)
+        for run in ("cold", "warm"):
+            accepted, elapsed = measure(lambda: [lazy.accepts(string) for string in strings])
+            stats = lazy.stats()
+            print(f"  cache {capacity or 'unbounded'!s:>9} {run}: {count / elapsed:10,.0f} strings/sec, "
+                  f"{stats['states']:,} states, {stats['hits']:,} hits, {stats['misses']:,} misses, "
+                  f"{stats['evictions']:,} evictions, {stats['fallbacks']:,} fallbacks")
+            assert accepted == expected
+            # Evicted states must not stay reachable from the cached ones.
+            assert all(lazy.states.get(target.subset) is target
+                       for state in lazy.states.values() for target in state.row.values())
+
+    fa = nth_from_end(10)
+    dense = fa.compile()
+    lazy = fa.to_lazy_dfa(capacity=2 ** 10)
+    strings = random_strings(count, longest=length)
+    print("n = 10, where every DFA state fits in the cache")
+    _, elapsed = measure(lambda: [dense.accepts(string) for string in strings])
+    print(f"  full DFA table:         {count / elapsed:10,.0f} strings/sec")
+    [lazy.accepts(string) for string in strings]
+    _, elapsed = measure(lambda: [lazy.accepts(string) for string in strings])
+    print(f"  lazy DFA, warm cache:   {count / elapsed:10,.0f} strings/sec")
+
+
+def redundant_dfa(size, seed=0):
+    """A random DFA of 2 * size states: two copies of one random DFA, with every
+    transition pointing into either copy, so at most `size` states are distinct."""
+    rng = random.Random(seed)
+    targets = [(rng.randrange(size), rng.randrange(size)) for _ in range(size)]
+    finals = {state for state in range(size) if rng.random() < 0.3}
+    name = lambda copy, state: f"{copy}:{state:07d}"
+    transitions = {}
+    for copy in (0, 1):
+        for state, (on_a, on_b) in enumerate(targets):
+            transitions[name(copy, state)] = {"a": [name(rng.randrange(2), on_a)],
+                                              "b": [name(rng.randrange(2), on_b)]}
+    states = set(transitions)
+    final_states = {name(copy, state) for copy in (0, 1) for state in finals}
+    return FiniteAutomaton(states, {"a", "b"}, transitions, name(0, 0), final_states)
+
+
+def bench_minimize(sizes=(5 * 10 ** 4, 10 ** 5)):
+    for size in sizes:
+        fa = redundant_dfa(size)
+        print(f"minimising a DFA with {len(fa.states):,} states")
+        minimal, elapsed = measure(fa.minimize)
+        print(f"  hopcroft: {elapsed:6.2f} s, {len(minimal.states):,} states left")
+        strings = random_strings(10 ** 4, longest=40)
+        assert [fa.accepts(string) for string in strings] == [minimal.accepts(string) for string in strings]
+
+
+def bench_cache(sizes=(12, 16)):
+    with tempfile.TemporaryDirectory() as directory:
+        cache = TableCache(directory)
+        for n in sizes:
+            fa = nth_from_end(n)
+            print(f"n-th symbol from the end, n = {n}: {2 ** n:,} DFA states")
+            _, elapsed = measure(lambda: nth_from_end(n).compile())
+            print(f"  no cache:             {elapsed * 1000:10.1f} ms")
+            _, elapsed = measure(lambda: nth_from_end(n).compile(cache))
+            print(f"  cold cache:           {elapsed * 1000:10.1f} ms (build + write)")
+            dense, elapsed = measure(lambda: fa.compile(cache))
+            print(f"  warm cache:           {elapsed * 1000:10.1f} ms (mmap)")
+            dfa, elapsed = measure(lambda: nth_from_end(n).to_dfa(cache))
+            print(f"  to_dfa, warm cache:   {elapsed * 1000:10.1f} ms")
+            strings = random_strings(10 ** 4, longest=40)
+            assert [dense.accepts(string) for string in strings] == [dfa.accepts(string) for string in strings]
+
+
+def keyword(word):
+    """An automaton accepting exactly `word`."""
+    states = [f"k{i}" for i in range(len(word) + 1)]
+    transitions = {states[i]: {symbol: [states[i + 1]]} for i, symbol in enumerate(word)}
+    return FiniteAutomaton(set(states), set(word), transitions, states[0], {states[-1]})
+
+
+def suffix(word, alphabet):
+    """An NFA accepting the strings over `alphabet` that end with `word`."""
+    fa = keyword(word)
+    fa.alphabet = set(alphabet)
+    fa.transitions["k0"] = {symbol: ["k0"] + fa.transitions["k0"].get(symbol, []) for symbol in alphabet}
+    return fa
+
+
+def bench_fuse(rule_count=1000, count=10 ** 5, seed=0):
+    rng = random.Random(seed)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    words = list({"".join(rng.choices(letters, k=rng.randrange(3, 9))) for _ in range(rule_count)})
+    rules = {f"keyword {word}": keyword(word) for word in words}
+    rules.update({f"ends with {ending}": suffix(ending, letters) for ending in ("ing", "ed", "tion")})
+    for rule in rules.values():
+        rule.compile()
+    strings = [rng.choice(words) if rng.random() < 0.3 else "".join(rng.choices(letters, k=rng.randrange(2, 10)))
+               for _ in range(count)]
+    print(f"{len(rules):,} rules, {count:,} strings")
+    fused, elapsed = measure(lambda: FiniteAutomaton.fuse(rules))
+    print(f"  fusing:               {elapsed * 1000:10.1f} ms, {len(fused):,} product states")
+    sample = strings[:count // 100]
+    expected, elapsed = measure(lambda: [[name for name, rule in rules.items() if rule.accepts(string)]
+                                         for string in sample])
+    print(f"  one pass per rule:    {len(sample) / elapsed:10,.0f} strings/sec")
+    matched, elapsed = measure(lambda: [fused.match(string) for string in strings])
+    print(f"  fused, single pass:   {count / elapsed:10,.0f} strings/sec")
+    assert matched[:len(sample)] == expected
+
+
+BENCHMARKS = {
+    'accepts_many': bench_accepts_many,
+    'scan': bench_scan,
+    'to_dfa': bench_to_dfa,
+    'stepper': bench_stepper,
+    'lazy_dfa': bench_lazy_dfa,
+    'minimize': bench_minimize,
+    'cache': bench_cache,
+    'fuse': bench_fuse,
+}
+
+if __name__ == "__main__":
+    for name in sys.argv[1:] or BENCHMARKS:
+        BENCHMARKS[name]()
@@ -0,0 +1,30 @@
+from array import array
+
+# The table code is shared with lab1, in the common package at the repository
+# root; the lab's entry points put that on sys.path.
+from common.table import DenseTable
+
+class DenseDFA(DenseTable):
+    """A deterministic FiniteAutomaton packed into a flat transition table (see DenseTable)."""
+
+    def __init__(self, states, alphabet, transitions, start_state, final_states):
+        self.states = sorted(states)
+        self.state_ids = {state: index for index, state in enumerate(self.states)}
+        self.symbols = sorted(alphabet)
+        self.symbol_ids = {symbol: index for index, symbol in enumerate(self.symbols)}
+        self.width = max(1, len(self.symbols))
+        self.table = array('i', [-1]) * (len(self.states) * self.width)
+        for state, trans in transitions.items():
+            row = self.state_ids[state] * self.width
+            for symbol, targets in trans.items():
+                if targets:
+                    target, = targets
+                    self.table[row + self.symbol_ids[symbol]] = self.state_ids[target] * self.width
+        self.accepting = array('B', [state in final_states for state in self.states])
+        self.start = self.state_ids[start_state] * self.width
+        self.padded = None
+
+    @classmethod
+    def from_automaton(cls, fa):
+        """Packs `fa`, which must be deterministic (see FiniteAutomaton.to_dfa())."""
+        return cls(fa.states, fa.alphabet, fa.transitions, fa.start_state, fa.final_states)
@@ -0,0 +1,148 @@
+from collections import OrderedDict
+
+from subsets import SubsetStepper
+
+# Thrash detection for a bounded cache: after every WINDOW symbols, if more
+# than one step in THRASH_RATIO evicted a state, the next BYPASS symbols are
+# run by plain subset stepping, and then the cache is tried again.
+WINDOW = 1 << 12
+THRASH_RATIO = 4
+BYPASS = 16 * WINDOW
+
+class CachedState:
+    """A DFA state discovered by LazyDFA: an NFA subset plus its known transitions.
+
+    `incoming` holds the (state, symbol) transitions that lead here. It is
+    only filled in when the cache is bounded, so that an evicted state can
+    be unlinked from every row that points at it.
+    """
+
+    __slots__ = ('subset', 'final', 'row', 'incoming')
+
+    def __init__(self, subset, final):
+        self.subset = subset
+        self.final = final
+        self.row = {}
+        self.incoming = set()
+
+class LazyDFA:
+    """Runs a FiniteAutomaton's NFA directly, determinising only what inputs reach.
+
+    The set of active NFA states is an integer bitset. Every subset that is
+    reached becomes a CachedState, and every transition taken is remembered
+    on it, so hot paths run at DFA speed: one dict lookup per symbol.
+
+    With a `capacity`, at most that many states are cached; the least
+    recently used one is evicted to make room, together with every
+    transition into or out of it, so nothing keeps it alive. Reaching it
+    again counts as a miss. When the cache thrashes (see THRASH_RATIO) it
+    is bypassed for a while and strings are run by simulate() instead.
+
+    `hits`, `misses` and `evictions` count transition lookups answered from
+    the cache, transitions that had to be computed, and evicted states;
+    `fallbacks` counts the times the cache was bypassed.
+    """
+
+    def __init__(self, fa, capacity=None):
+        self.stepper = SubsetStepper(fa.states, fa.alphabet, fa.transitions, fa.final_states)
+        self.capacity = capacity
+        self.states = {}
+        # Recency order, only kept when the cache is bounded.
+        self.recent = OrderedDict()
+        self.hits = self.misses = self.evictions = self.fallbacks = 0
+        self.window_steps = self.window_evictions = self.bypass = 0
+        self.start_subset = self.stepper.bit(fa.start_state)
+
+    def __len__(self):
+        return len(self.states)
+
+    def stats(self):
+        return {'states': len(self.states), 'hits': self.hits, 'misses': self.misses,
+                'evictions': self.evictions, 'fallbacks': self.fallbacks}
+
+    def state(self, subset):
+        """The cached state for `subset`, creating (and possibly evicting) as needed."""
+        state = self.states.get(subset)
+        if self.capacity is None:
+            if state is None:
+                state = self.states[subset] = CachedState(subset, self.stepper.is_final(subset))
+            return state
+        if state is not None:
+            self.recent.move_to_end(state)
+            return state
+        if len(self.states) >= self.capacity:
+            self.evict()
+        state = self.states[subset] = CachedState(subset, self.stepper.is_final(subset))
+        self.recent[state] = None
+        return state
+
+    def evict(self):
+        """Drops the least recently used state and every transition into or out of it."""
+        old, _ = self.recent.popitem(last=False)
+        del self.states[old.subset]
+        for source, symbol in old.incoming:
+            del source.row[symbol]
+        for symbol, target in old.row.items():
+            target.incoming.discard((old, symbol))
+        self.evictions += 1
+
+    def next_state(self, state, symbol):
+        self.misses += 1
+        target = self.state(self.stepper.step(state.subset, symbol))
+        if self.capacity is None:
+            state.row[symbol] = target
+        elif self.states.get(state.subset) is state:  # with capacity 1 it may just have been evicted
+            state.row[symbol] = target
+            target.incoming.add((state, symbol))
+        return target
+
+    def accepts(self, string):
+        if self.bypass > 0:
+            self.bypass -= len(string)
+            return self.simulate(string)
+        tables = self.stepper.tables
+        touch = self.recent.move_to_end if self.capacity is not None else None
+        evictions = self.evictions
+        state = self.state(self.start_subset)
+        hits = 0
+        for symbol in string:
+            target = state.row.get(symbol)
+            if target is not None:
+                hits += 1
+                if touch is not None:
+                    touch(target)
+            elif symbol not in tables:
+                accepted = False
+                break
+            else:
+                target = self.next_state(state, symbol)
+            state = target
+        else:
+            accepted = state.final
+        self.hits += hits
+        if touch is not None:
+            self.watch(len(string), self.evictions - evictions)
+        return accepted
+
+    def watch(self, steps, evictions):
+        """Counts a string towards the thrash window, and bypasses the cache if it thrashes."""
+        self.window_steps += steps
+        self.window_evictions += evictions
+        if self.window_steps >= WINDOW:
+            if self.window_evictions * THRASH_RATIO > self.window_steps:
+                self.bypass = BYPASS
+                self.fallbacks += 1
+            self.window_steps = self.window_evictions = 0
+
+    def simulate(self, string):
+        """Plain NFA simulation over bitsets, with no caching at all."""
+        stepper = self.stepper
+        tables = stepper.tables
+        subset = self.start_subset
+        for symbol in string:
+            if symbol not in tables:
+                return False
+            subset = stepper.step(subset, symbol)
+            if not subset:
+                return False
+        return stepper.is_final(subset)
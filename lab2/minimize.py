@@ -0,0 +1,59 @@
+def hopcroft(count, width, table, accepting):
+    """Hopcroft's partition refinement over a complete DFA with integer states.
+
+    `table[state * width + symbol]` is the target of every transition and
+    `accepting[state]` is truthy for final states. Returns a list giving the
+    block (equivalence class) of each state. Runs in O(n * k * log n): a
+    splitter only goes back on the worklist for the smaller half of a split.
+    """
+    # predecessors[symbol][target] lists the states that reach target on symbol.
+    predecessors = [[[] for _ in range(count)] for _ in range(width)]
+    for state in range(count):
+        row = state * width
+        for symbol in range(width):
+            predecessors[symbol][table[row + symbol]].append(state)
+
+    final = {state for state in range(count) if accepting[state]}
+    blocks = [block for block in (final, set(range(count)) - final) if block]
+    block_of = [0] * count
+    for index, block in enumerate(blocks):
+        for state in block:
+            block_of[state] = index
+
+    smallest = min(range(len(blocks)), key=lambda index: len(blocks[index]))
+    pending = {(smallest, symbol) for symbol in range(width)} if len(blocks) == 2 else set()
+    worklist = list(pending)
+    while worklist:
+        splitter, symbol = worklist.pop()
+        pending.discard((splitter, symbol))
+        # Group the states that enter the splitter on `symbol` by their block.
+        marked = {}
+        incoming = predecessors[symbol]
+        for target in blocks[splitter]:
+            for state in incoming[target]:
+                block = block_of[state]
+                if block in marked:
+                    marked[block].append(state)
+                else:
+                    marked[block] = [state]
+        for block, states in marked.items():
+            members = blocks[block]
+            if len(states) == len(members):
+                continue
+            new = len(blocks)
+            moved = set(states)
+            members -= moved
+            blocks.append(moved)
+            for state in moved:
+                block_of[state] = new
+            for other in range(width):
+                if (block, other) in pending:
+                    entry = (new, other)
+                elif len(moved) <= len(members):
+                    entry = (new, other)
+                else:
+                    entry = (block, other)
+                if entry not in pending:
+                    pending.add(entry)
+                    worklist.append(entry)
+    return block_of
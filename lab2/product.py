@@ -0,0 +1,107 @@
+from array import array
+from collections import deque
+
+from dense import DenseDFA
+
+class Product:
+    """The product of several DenseDFAs, explored from the start state only.
+
+    A product state is a tuple of (part index, row) pairs for the parts that
+    are still alive, in part order; a part whose DFA has no transition on a
+    symbol simply drops out. Keeping only live parts makes a step cost
+    proportional to the parts that can still accept, so fusing many rules
+    that die early (keywords, literals) stays cheap.
+    """
+
+    def __init__(self, parts):
+        self.parts = list(parts)
+        self.symbols = sorted({symbol for part in self.parts for symbol in part.symbols})
+        # columns[i] lists (symbol, column) for every symbol part i knows.
+        self.columns = [list(part.symbol_ids.items()) for part in self.parts]
+        self.start = tuple((index, part.start) for index, part in enumerate(self.parts))
+
+    def accepted(self, state):
+        """The indices of the parts in an accepting state."""
+        parts = self.parts
+        return tuple(index for index, row in state if parts[index].accepting[row // parts[index].width])
+
+    def moves(self, state):
+        """Maps each symbol to the product state it leads to; dead targets are left out."""
+        targets = {}
+        for index, row in state:
+            table = self.parts[index].table
+            for symbol, column in self.columns[index]:
+                target = table[row + column]
+                if target >= 0:
+                    if symbol in targets:
+                        targets[symbol].append((index, target))
+                    else:
+                        targets[symbol] = [(index, target)]
+        return {symbol: tuple(pairs) for symbol, pairs in targets.items()}
+
+    def explore(self):
+        """Yields (state, moves) for every reachable product state, breadth first."""
+        seen = {self.start}
+        queue = deque([self.start])
+        while queue:
+            state = queue.popleft()
+            moves = self.moves(state)
+            yield state, moves
+            for target in moves.values():
+                if target not in seen:
+                    seen.add(target)
+                    queue.append(target)
+
+class RuleSet:
+    """Many rule automata fused into one DFA that reports which rules accept.
+
+    `rules` maps rule names to FiniteAutomatons. The reachable product of
+    their DFAs is packed into a single DenseDFA (accepting wherever any rule
+    accepts) and every state records the names of the rules it accepts, so
+    a string is checked against all rules in one pass.
+    """
+
+    def __init__(self, rules):
+        self.names = list(rules)
+        product = Product(rule.compile() for rule in rules.values())
+        ids = {}
+        moves = []
+        for state, targets in product.explore():
+            ids[state] = len(ids)
+            moves.append(targets)
+        symbols = product.symbols
+        symbol_ids = {symbol: index for index, symbol in enumerate(symbols)}
+        width = max(1, len(symbols))
+        table = array('i', [-1]) * (len(ids) * width)
+        for state, targets in enumerate(moves):
+            row = state * width
+            for symbol, target in targets.items():
+                table[row + symbol_ids[symbol]] = ids[target] * width
+        # Each state's accepted rules, shared between states that accept the same ones.
+        interned = {}
+        self.matches = [interned.setdefault(accepted, [self.names[index] for index in accepted])
+                        for accepted in map(product.accepted, ids)]
+        accepting = array('B', [bool(names) for names in self.matches])
+        self.dense = DenseDFA.from_table(list(range(len(ids))), symbols, table, accepting, 0)
+
+    def __len__(self):
+        return len(self.dense.states)
+
+    def accepts(self, string):
+        """Whether any rule accepts `string`."""
+        return self.dense.accepts(string)
+
+    def match(self, string):
+        """The names of the rules that accept `string`, in rule order."""
+        dense = self.dense
+        table = dense.table
+        symbol_ids = dense.symbol_ids
+        row = dense.start
+        for symbol in string:
+            column = symbol_ids.get(symbol)
+            if column is None:
+                return []
+            row = table[row + column]
+            if row < 0:
+                return []
+        return list(self.matches[row // dense.width])
@@ -0,0 +1,160 @@
+import mmap
+import os
+import re
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+from dense import DenseDFA
+
+# Pseudo-symbol for every byte outside the automaton's alphabet.
+OTHER = ''
+
+class ByteScanner:
+    """Finds every match of a FiniteAutomaton's language in raw bytes.
+
+    A match is reported by its end offset: the position just past the last
+    byte of some substring the automaton accepts. Adding a self-loop on every
+    byte to the start state and determinising gives a search DFA that is in
+    an accepting state exactly at those offsets. It is packed into a
+    256-column table of row offsets (state id * 256), so a step is one index
+    per byte. Symbols must be single ASCII characters.
+    """
+
+    def __init__(self, fa):
+        for symbol in fa.alphabet:
+            if len(symbol) != 1 or ord(symbol) > 127:
+                raise ValueError(f"Symbol {symbol!r} is not a single ASCII character")
+        transitions = {state: {symbol: list(targets) for symbol, targets in trans.items()}
+                       for state, trans in fa.transitions.items()}
+        loops = transitions.setdefault(fa.start_state, {})
+        for symbol in list(fa.alphabet) + [OTHER]:
+            loops[symbol] = loops.get(symbol, []) + [fa.start_state]
+        search = type(fa)(fa.states, set(fa.alphabet) | {OTHER}, transitions, fa.start_state, fa.final_states)
+        dense = DenseDFA.from_automaton(search.to_dfa())
+
+        columns = [dense.symbol_ids.get(chr(byte), dense.symbol_ids[OTHER]) for byte in range(256)]
+        self.table = array('q', bytes(8 * 256 * len(dense.states)))
+        for state in range(len(dense.states)):
+            row = state * dense.width
+            for byte, column in enumerate(columns):
+                self.table[state * 256 + byte] = dense.table[row + column] // dense.width * 256
+        self.accepting = bytes(dense.accepting)
+        self.start = dense.start // dense.width * 256
+        # In the start state most bytes lead straight back to it; a regex over
+        # the bytes that do not lets scan() jump over those runs in C.
+        # That is only safe when the start state itself does not accept.
+        leaving = bytes(byte for byte in range(256) if self.table[self.start + byte] != self.start)
+        if self.accepting[self.start >> 8]:
+            self.skip = None
+        elif leaving:
+            self.skip = re.compile(b'[' + re.escape(leaving) + b']')
+        else:
+            self.skip = re.compile(b'(?!)')
+
+    def rows(self):
+        return range(0, len(self.table), 256)
+
+    def scan(self, data, begin=0, end=None, row=None, count_only=False):
+        """Runs the search DFA over data[begin:end] from `row` (default: start).
+
+        `data` can be bytes or an mmap. Returns (matches, final row), where
+        matches is an array('q') of end offsets, or their count.
+        """
+        end = len(data) if end is None else end
+        row = self.start if row is None else row
+        table, accepting, start, skip = self.table, self.accepting, self.start, self.skip
+        matches = 0 if count_only else array('q')
+        record = None if count_only else matches.append
+        count = 0
+        position = begin
+        while position < end:
+            if row == start and skip is not None:
+                found = skip.search(data, position, end)
+                if found is None:
+                    break
+                position = found.start()
+            row = table[row + data[position]]
+            position += 1
+            if accepting[row >> 8]:
+                if record is None:
+                    count += 1
+                else:
+                    record(position)
+        return (count if count_only else matches), row
+
+    def scan_chunk(self, path, begin, end, count_only=False):
+        """Scans one chunk of a file, speculatively from every state unless begin is 0.
+
+        Returns (runs, tail): runs maps each possible entry row to (matches
+        before the runs merged, exit row), and `tail` holds the matches found
+        after every run had merged into one.
+        """
+        with open(path, 'rb') as source, mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            if begin == 0:
+                matches, row = self.scan(data, begin, end, count_only=count_only)
+                return {self.start: (matches, row)}, (0 if count_only else array('q'))
+            return self.speculate(data, begin, end, count_only)
+
+    def speculate(self, data, begin, end, count_only):
+        table, accepting = self.table, self.accepting
+        # Runs are advanced in lockstep, grouped by current row; runs that reach
+        # the same row share their future, so they merge for good.
+        groups = {row: [row] for row in self.rows()}
+        before = {row: (0 if count_only else array('q')) for row in self.rows()}
+        position = begin
+        while len(groups) > 1 and position < end:
+            byte = data[position]
+            position += 1
+            merged = {}
+            for row, origins in groups.items():
+                target = table[row + byte]
+                if target in merged:
+                    merged[target].extend(origins)
+                else:
+                    merged[target] = origins
+            groups = merged
+            for row, origins in groups.items():
+                if accepting[row >> 8]:
+                    for origin in origins:
+                        if count_only:
+                            before[origin] += 1
+                        else:
+                            before[origin].append(position)
+        tail = 0 if count_only else array('q')
+        if len(groups) == 1:
+            (row, origins), = groups.items()
+            tail, row = self.scan(data, position, end, row, count_only)
+            groups = {row: origins}
+        runs = {}
+        for row, origins in groups.items():
+            for origin in origins:
+                runs[origin] = (before[origin], row)
+        return runs, tail
+
+    def scan_file(self, path, processes=1, count_only=False, chunk_size=None):
+        """Scans a whole file through mmap; returns match end offsets or their count.
+
+        With several processes the file is cut into chunks that are scanned
+        concurrently; every chunk after the first is run from all states at
+        once and the right run is picked once the previous chunk's exit state
+        is known.
+        """
+        size = os.path.getsize(path)
+        if size == 0:
+            return 0 if count_only else array('q')
+        if processes <= 1:
+            runs, tail = self.scan_chunk(path, 0, size, count_only)
+            return runs[self.start][0]
+        chunk_size = chunk_size or -(-size // processes)
+        bounds = [(begin, min(begin + chunk_size, size)) for begin in range(0, size, chunk_size)]
+        with ProcessPoolExecutor(processes) as executor:
+            futures = [executor.submit(self.scan_chunk, path, begin, end, count_only)
+                       for begin, end in bounds]
+            total = 0 if count_only else array('q')
+            row = self.start
+            for future in futures:
+                runs, tail = future.result()
+                matches, row = runs[row]
+                total += matches
+                total += tail
+        return total
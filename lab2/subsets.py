@@ -0,0 +1,89 @@
+import re
+
+CHUNK_BITS = 8
+# Subsets wider than this many bytes are scanned for their non-zero bytes
+# (the 8-state slices in use) with NONZERO instead of byte by byte.
+SCAN_BYTES = 256
+NONZERO = re.compile(rb'[^\x00]')
+
+class SubsetStepper:
+    """Moves sets of NFA states, held as integer bitsets, through the transitions.
+
+    Bit i stands for the i-th state in sorted order. `moves[symbol][i]` holds
+    the indices of the targets of state i. A step looks at the subset one byte (8
+    states) at a time: the union of the targets of a byte's states is
+    computed on first use and kept in a 256-entry table for that symbol and
+    slice, so a step costs one lookup per non-empty byte and memory only grows
+    with the (slice, byte) combinations that inputs actually reach. Empty
+    bytes of wide subsets are skipped by a regex over the subset's bytes, so
+    the big integer is never shifted.
+    """
+
+    def __init__(self, states, alphabet, transitions, final_states):
+        targets = {target for trans in transitions.values() for targets in trans.values() for target in targets}
+        self.states = sorted(set(states) | set(transitions) | targets)
+        self.index = index = {state: position for position, state in enumerate(self.states)}
+        self.symbols = sorted(alphabet)
+        self.final_mask = sum(1 << index[state] for state in set(final_states) if state in index)
+        self.size = (len(self.states) + CHUNK_BITS - 1) // CHUNK_BITS
+        self.moves = {}
+        # tables[symbol][slice]: None until that slice is first stepped on `symbol`.
+        self.tables = {}
+        for symbol in self.symbols:
+            moves = [()] * len(self.states)
+            for state, trans in transitions.items():
+                targets = trans.get(symbol)
+                if targets:
+                    moves[index[state]] = tuple(index[target] for target in targets)
+            self.moves[symbol] = moves
+            self.tables[symbol] = [None] * self.size
+
+    def bit(self, state):
+        """The subset holding just `state`."""
+        return 1 << self.index[state]
+
+    def step(self, subset, symbol):
+        """The set of states reachable from `subset` on `symbol`."""
+        tables = self.tables[symbol]
+        target = 0
+        data = subset.to_bytes(self.size, 'little')
+        if self.size <= SCAN_BYTES:
+            chunks = enumerate(data)
+        else:
+            chunks = ((match.start(), ord(match.group())) for match in NONZERO.finditer(data))
+        for chunk, byte in chunks:
+            if byte:
+                try:
+                    target |= tables[chunk][byte]
+                except TypeError:  # that slice, or that byte of it, is not filled in yet
+                    target |= self.fill(symbol, chunk, byte)
+        return target
+
+    def fill(self, symbol, chunk, byte):
+        """Computes and keeps the targets on `symbol` of the states in `byte` of slice `chunk`."""
+        table = self.tables[symbol][chunk]
+        if table is None:
+            table = self.tables[symbol][chunk] = [None] * (1 << CHUNK_BITS)
+        moves = self.moves[symbol]
+        first = chunk * CHUNK_BITS
+        union = 0
+        bits = byte
+        while bits:
+            low = bits & -bits
+            for target in moves[first + low.bit_length() - 1]:
+                union |= 1 << target
+            bits ^= low
+        table[byte] = union
+        return union
+
+    def is_final(self, subset):
+        return bool(subset & self.final_mask)
+
+    def name(self, subset):
+        """The DFA state name for a subset: its members joined with commas, as before."""
+        names = []
+        while subset:
+            low = subset & -subset
+            names.append(self.states[low.bit_length() - 1])
+            subset ^= low
+        return ','.join(names)
@@ -0,0 +1,118 @@
+import io
+import sys
+import time
+
+from lexer import Token, Lexer, KEYWORDS, TOKEN_TYPES, stream_tokens
+
+STATEMENT = "for (i = 0; i <= 10; i = i + 1) { sin(i); cos(12.5); tan(total_count); x = x >= 3; } "
+LONG_LEXEMES = "accumulated_sensor_reading_total = 31415926535.897932384626 * scale_factor_for_channel;     "
+
+
+class LegacyLexer(Lexer):
+    """The original character-at-a-time scanner, kept for comparison."""
+
+    def advance(self):
+        self.position += 1
+        self.current_char = self.text[self.position] if self.position < len(self.text) else None
+
+    def peek(self):
+        next_pos = self.position + 1
+        return self.text[next_pos] if next_pos < len(self.text) else None
+
+    def skip_whitespace(self):
+        while self.current_char is not None and self.current_char in ' \t':
+            self.advance()
+
+    def get_number(self):
+        num_str = ''
+        while self.current_char is not None and self.current_char.isdigit():
+            num_str += self.current_char
+            self.advance()
+        if self.current_char == '.':
+            num_str += self.current_char
+            self.advance()
+            while self.current_char is not None and self.current_char.isdigit():
+                num_str += self.current_char
+                self.advance()
+        return Token(TOKEN_TYPES['NUMBER'], float(num_str) if '.' in num_str else int(num_str))
+
+    def get_identifier(self):
+        ident_str = ''
+        while self.current_char is not None and (self.current_char.isalnum() or self.current_char == '_'):
+            ident_str += self.current_char
+            self.advance()
+        return Token(KEYWORDS.get(ident_str, 'IDENTIFIER'), ident_str)
+
+    def get_next_token(self):
+        while self.current_char is not None:
+            if self.current_char in ' \t':
+                self.skip_whitespace()
+                continue
+            if self.current_char.isdigit():
+                return self.get_number()
+            if self.current_char.isalpha():
+                return self.get_identifier()
+            for char, type_ in (('+', 'PLUS'), ('-', 'MINUS'), ('*', 'MULTIPLY'), ('/', 'DIVIDE'),
+                                ('(', 'LPAREN'), (')', 'RPAREN'), ('=', 'EQUAL'), ('{', 'LBRACE'),
+                                ('}', 'RBRACE'), (';', 'SEMICOLON')):
+                if self.current_char == char:
+                    self.advance()
+                    return Token(type_, char)
+            if self.current_char in '<>':
+                char = self.current_char
+                double = 'LESSEQUAL' if char == '<' else 'GREATEREQUAL'
+                if self.peek() == '=':
+                    self.advance()
+                    self.advance()
+                    return Token(double, char + '=')
+                self.advance()
+                return Token('LESS' if char == '<' else 'GREATER', char)
+            raise ValueError(f"Unrecognized character: {self.current_char}")
+        return None
+
+
+def measure(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def bench_tokenize(size=2 * 1024 * 1024):
+    for label, statement in (("short lexemes", STATEMENT), ("long lexemes", LONG_LEXEMES)):
+        code = statement * max(1, size // len(statement))
+        print(f"Tokenizing {len(code) / 1e6:.1f} MB, {label}")
+        tokens, elapsed = measure(Lexer(code).tokenize)
+        print(f"  sliced + dispatch table: {len(tokens) / elapsed:12,.0f} tokens/sec")
+        legacy, legacy_elapsed = measure(LegacyLexer(code).tokenize)
+        print(f"  per-character (before):  {len(legacy) / legacy_elapsed:12,.0f} tokens/sec")
+        assert [(t.type, t.value) for t in tokens] == [(t.type, t.value) for t in legacy]
+
+
+def bench_stream(size=2 * 1024 * 1024, chunk_sizes=(1, 7, 64, 4096, 1 << 16)):
+    """Streams the input in chunks; tokens and spans must match a whole-text tokenize."""
+    code = STATEMENT * max(1, size // len(STATEMENT))
+    print(f"Streaming {len(code) / 1e6:.1f} MB")
+    for chunk_size in chunk_sizes:
+        # Tiny chunks are slow to decode; a shorter input still crosses many boundaries.
+        text = code if chunk_size >= 64 else code[:64 * 1024]
+        expected = [(t.type, t.value, t.start, t.end) for t in Lexer(text).tokenize()]
+        tokens, elapsed = measure(lambda: list(stream_tokens(io.BytesIO(text.encode()), chunk_size)))
+        print(f"  chunk {chunk_size:>6}: {len(tokens) / elapsed:12,.0f} tokens/sec")
+        assert [(t.type, t.value, t.start, t.end) for t in tokens] == expected
+    bad = code[:5000] + "@"
+    try:
+        list(stream_tokens(io.StringIO(bad), 7))
+    except ValueError as error:
+        assert str(error).endswith(f"at position {len(bad) - 1}"), error
+    else:
+        raise AssertionError("expected a ValueError")
+
+
+BENCHMARKS = {
+    'tokenize': bench_tokenize,
+    'stream': bench_stream,
+}
+
+if __name__ == "__main__":
+    for name in sys.argv[1:] or BENCHMARKS:
+        BENCHMARKS[name]()
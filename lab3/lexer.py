@@ -1,4 +1,9 @@
+import codecs
 import math
+import re
+import string
+
+CHUNK_SIZE = 1 << 16
 
 TOKEN_TYPES = {
     'NUMBER': 'NUMBER',
@@ -35,129 +40,156 @@ KEYWORDS = {
 }
 
 class Token:
-    def __init__(self, type_, value=None):
+    __slots__ = ('type', 'value', 'start', 'end')
+
+    def __init__(self, type_, value=None, start=None, end=None):
         self.type = type_
         self.value = value
+        # Source span [start, end) in characters, when the lexer knows it.
+        self.start = start
+        self.end = end
 
     def __repr__(self):
         return f"Token({self.type}, {repr(self.value)})"
 
+# Lexeme boundaries are found with these patterns and sliced out in one step.
+# `\w` is exactly `isalnum() or '_'`, matching the identifier rule.
+WHITESPACE_REGEX = re.compile(r'[ \t]*')
+NUMBER_REGEX = re.compile(r'\d*(?:\.\d*)?')
+IDENTIFIER_REGEX = re.compile(r'\w*')
+
+SINGLE_CHAR_TOKENS = {
+    '+': 'PLUS',
+    '-': 'MINUS',
+    '*': 'MULTIPLY',
+    '/': 'DIVIDE',
+    '(': 'LPAREN',
+    ')': 'RPAREN',
+    '=': 'EQUAL',
+    '{': 'LBRACE',
+    '}': 'RBRACE',
+    ';': 'SEMICOLON'
+}
+
+COMPARISON_TOKENS = {
+    '<': ('LESS', 'LESSEQUAL'),
+    '>': ('GREATER', 'GREATEREQUAL')
+}
+
+# What each ASCII character that can start a token scans as: the token type
+# of a single-character token, or one of the markers below. Other characters
+# fall back to the isdigit/isalpha checks.
+NUMBER = object()
+IDENTIFIER = object()
+COMPARISON = object()
+
+DISPATCH = dict(SINGLE_CHAR_TOKENS)
+DISPATCH.update(dict.fromkeys(COMPARISON_TOKENS, COMPARISON))
+DISPATCH.update(dict.fromkeys(string.digits, NUMBER))
+DISPATCH.update(dict.fromkeys(string.ascii_letters, IDENTIFIER))
+
 class Lexer:
-    def __init__(self, text):
+    def __init__(self, text, offset=0):
         self.text = text
+        # Where `text` starts in the whole input; added to spans and error positions.
+        self.offset = offset
         self.position = 0
         self.current_char = self.text[self.position] if self.text else None
 
-    def advance(self):
-        """Move to the next character."""
-        self.position += 1
-        self.current_char = self.text[self.position] if self.position < len(self.text) else None
-
-    def peek(self):
-        """Look at the next character without advancing."""
-        next_pos = self.position + 1
-        return self.text[next_pos] if next_pos < len(self.text) else None
-
-    def skip_whitespace(self):
-        """Skip spaces and tabs."""
-        while self.current_char is not None and self.current_char in ' \t':
-            self.advance()
-
-    def get_number(self):
-        """Extracts a number (integer or float)."""
-        num_str = ''
-        while self.current_char is not None and self.current_char.isdigit():
-            num_str += self.current_char
-            self.advance()
-        
-        if self.current_char == '.': 
-            num_str += self.current_char
-            self.advance()
-            while self.current_char is not None and self.current_char.isdigit():
-                num_str += self.current_char
-                self.advance()
-        
-        return Token(TOKEN_TYPES['NUMBER'], float(num_str) if '.' in num_str else int(num_str))
-
-    def get_identifier(self):
-        """Extracts an identifier (variable name or keyword)."""
-        ident_str = ''
-        while self.current_char is not None and (self.current_char.isalnum() or self.current_char == '_'):
-            ident_str += self.current_char
-            self.advance()
-
-        token_type = KEYWORDS.get(ident_str, 'IDENTIFIER')
-        return Token(token_type, ident_str)
+    def seek(self, position):
+        """Jump to `position`."""
+        self.position = position
+        self.current_char = self.text[position] if position < len(self.text) else None
 
     def get_next_token(self):
-        """Extracts the next token from the input text."""
-        while self.current_char is not None:
-            if self.current_char in ' \t':
-                self.skip_whitespace()
-                continue
-            if self.current_char.isdigit():
-                return self.get_number()
-            if self.current_char.isalpha():
-                return self.get_identifier()
-            if self.current_char == '+':
-                self.advance()
-                return Token('PLUS', '+')
-            if self.current_char == '-':
-                self.advance()
-                return Token('MINUS', '-')
-            if self.current_char == '*':
-                self.advance()
-                return Token('MULTIPLY', '*')
-            if self.current_char == '/':
-                self.advance()
-                return Token('DIVIDE', '/')
-            if self.current_char == '(':
-                self.advance()
-                return Token('LPAREN', '(')
-            if self.current_char == ')':
-                self.advance()
-                return Token('RPAREN', ')')
-            if self.current_char == '=':
-                self.advance()
-                return Token('EQUAL', '=')
-            if self.current_char == '{':
-                self.advance()
-                return Token('LBRACE', '{')
-            if self.current_char == '}':
-                self.advance()
-                return Token('RBRACE', '}')
-            if self.current_char == ';':
-                self.advance()
-                return Token('SEMICOLON', ';')
-            if self.current_char == '<':
-                if self.peek() == '=':
-                    self.advance()
-                    self.advance()
-                    return Token('LESSEQUAL', '<=')
-                self.advance()
-                return Token('LESS', '<')
-            if self.current_char == '>':
-                if self.peek() == '=':
-                    self.advance()
-                    self.advance()
-                    return Token('GREATEREQUAL', '>=')
-                self.advance()
-                return Token('GREATER', '>')
-
-            raise ValueError(f"Unrecognized character: {self.current_char}")
-
-        return None
+        """Extracts the next token from the input text, recording its source span."""
+        text = self.text
+        pos = self.position
+        length = len(text)
+        base = self.offset
+        if pos < length and (text[pos] == ' ' or text[pos] == '\t'):
+            pos = WHITESPACE_REGEX.match(text, pos).end()
+        if pos >= length:
+            self.seek(pos)
+            return None
+
+        char = text[pos]
+        kind = DISPATCH.get(char)
+        if kind is None:
+            if char.isdigit():
+                kind = NUMBER
+            elif char.isalpha():
+                kind = IDENTIFIER
+            else:
+                self.seek(pos)
+                raise ValueError(f"Unrecognized character: {char} at position {base + pos}")
+
+        if kind is NUMBER:
+            end = NUMBER_REGEX.match(text, pos).end()
+            num_str = text[pos:end]
+            token = Token(TOKEN_TYPES['NUMBER'], float(num_str) if '.' in num_str else int(num_str), base + pos, base + end)
+        elif kind is IDENTIFIER:
+            end = IDENTIFIER_REGEX.match(text, pos).end()
+            ident_str = text[pos:end]
+            token = Token(KEYWORDS.get(ident_str, 'IDENTIFIER'), ident_str, base + pos, base + end)
+        elif kind is COMPARISON:
+            single, double = COMPARISON_TOKENS[char]
+            if pos + 1 < length and text[pos + 1] == '=':
+                end = pos + 2
+                token = Token(double, char + '=', base + pos, base + end)
+            else:
+                end = pos + 1
+                token = Token(single, char, base + pos, base + end)
+        else:
+            end = pos + 1
+            token = Token(kind, char, base + pos, base + end)
+
+        self.position = end
+        self.current_char = text[end] if end < length else None
+        return token
 
     def tokenize(self):
         """Tokenizes the entire input string."""
         tokens = []
-        while (token := self.get_next_token()) is not None:
-            tokens.append(token)
+        append = tokens.append
+        next_token = self.get_next_token
+        while (token := next_token()) is not None:
+            append(token)
         return tokens
 
-code = "for (i = 0; i <= 10; i = i + 1) { sin(i); cos(i); tan(i); cot(i); if (x > y) { x = y; } }"
-lexer = Lexer(code)
-tokens = lexer.tokenize()
-
-for token in tokens:
-    print(token)
+    def iter_tokens(self):
+        """Yields tokens one at a time instead of building a list."""
+        while (token := self.get_next_token()) is not None:
+            yield token
+
+def stream_tokens(stream, chunk_size=CHUNK_SIZE):
+    """Lazily tokenizes a file object or mmap, reading it chunk by chunk."""
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    buffer = ''
+    offset = 0
+    while True:
+        chunk = stream.read(chunk_size)
+        eof = not chunk
+        if isinstance(chunk, bytes):
+            chunk = decoder.decode(chunk, final=eof)
+        buffer += chunk
+        lexer = Lexer(buffer, offset)
+        consumed = 0
+        while (token := lexer.get_next_token()) is not None:
+            # A token touching the end of the buffer may continue in the next chunk.
+            if not eof and lexer.position >= len(buffer):
+                break
+            yield token
+            consumed = lexer.position
+        if eof:
+            return
+        buffer = buffer[consumed:]
+        offset += consumed
+
+if __name__ == "__main__":
+    code = "for (i = 0; i <= 10; i = i + 1) { sin(i); cos(i); tan(i); cot(i); if (x > y) { x = y; } }"
+    lexer = Lexer(code)
+    tokens = lexer.tokenize()
+
+    for token in tokens:
+        print(token)